@@ -0,0 +1,92 @@
+"""
+A vinyl backend over sqlite for the benchmarks.
+
+The sync mode uses the sqlite connection of the wrapper. The async mode goes
+through a stand-in of an async driver: the statements run on the same
+connection and every call yields to the event loop once, as a round trip
+to the server would. So the async figures measure what vinyl costs on top
+of the driver, not the network.
+"""
+import asyncio
+from contextlib import asynccontextmanager, contextmanager
+
+from django.db.backends.sqlite3.base import DatabaseWrapper as SQLiteDatabaseWrapper
+from django.db.backends.sqlite3.operations import (
+    DatabaseOperations as SQLiteDatabaseOperations,
+)
+
+from vinyl.backend import BaseDatabaseWrapper
+
+
+class DatabaseOperations(SQLiteDatabaseOperations):
+    compiler_module = "vinyl.compiler"
+
+
+class AsyncCursor:
+
+    def __init__(self, cursor):
+        self.cursor = cursor
+
+    async def execute(self, sql, params=()):
+        await asyncio.sleep(0)
+        return self.cursor.execute(sql, params)
+
+    async def fetchone(self):
+        return self.cursor.fetchone()
+
+    async def fetchall(self):
+        return self.cursor.fetchall()
+
+    async def fetchmany(self, size):
+        return self.cursor.fetchmany(size)
+
+    @property
+    def rowcount(self):
+        return self.cursor.rowcount
+
+    @property
+    def lastrowid(self):
+        return self.cursor.lastrowid
+
+    @property
+    def description(self):
+        return self.cursor.description
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.cursor.close()
+
+
+class AsyncConnection:
+
+    def __init__(self, wrapper):
+        self.wrapper = wrapper
+
+    def cursor(self):
+        return AsyncCursor(self.wrapper.get_cursor())
+
+
+class DatabaseWrapper(BaseDatabaseWrapper, SQLiteDatabaseWrapper):
+    ops_class = DatabaseOperations
+    async_pool = None
+
+    @property
+    def sync_connection(self):
+        return self
+
+    @contextmanager
+    def sync_cursor(self):
+        cursor = self.get_cursor()
+        try:
+            yield cursor
+        finally:
+            cursor.close()
+
+    async def start_pool(self):
+        self.async_pool = True
+
+    @asynccontextmanager
+    async def get_connection_from_pool(self):
+        yield AsyncConnection(self)
@@ -0,0 +1,90 @@
+"""
+Compare django's per-cell converters with vinyl's column-wise ones.
+
+    python -m benchmarks.converters [--rows 100000] [--repeat 5]
+"""
+import argparse
+import datetime
+import decimal
+import time
+import uuid
+
+from benchmarks.env import setup
+
+
+def populate(rows):
+    from benchmarks.models import Mixed
+
+    now = datetime.datetime.now(datetime.timezone.utc)
+    Mixed.objects.bulk_create(
+        [
+            Mixed(
+                title=f"title {i}",
+                number=i,
+                flag=bool(i % 2),
+                created=now - datetime.timedelta(seconds=i),
+                day=now.date() - datetime.timedelta(days=i % 1000),
+                price=decimal.Decimal(i % 10000) / 100,
+                uid=uuid.uuid4(),
+                data={"i": i, "tags": ["a", "b"]},
+            )
+            for i in range(rows)
+        ],
+        batch_size=1000,
+    )
+
+
+def fetch_rows(compiler):
+    sql, params = compiler.as_sql()
+    with compiler.connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return cursor.fetchall()
+
+
+def measure(fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    setup()
+    populate(args.rows)
+
+    from django.db import connection
+    from django.db.models.sql.compiler import SQLCompiler as DjangoSQLCompiler
+
+    from benchmarks.models import Mixed
+    from vinyl.compiler import SQLCompiler
+
+    query = Mixed.objects.all().query
+    compilers = {
+        "django": DjangoSQLCompiler(query, connection, "default"),
+        "vinyl": SQLCompiler(query, connection, "default"),
+    }
+    rows = fetch_rows(compilers["django"])
+    results = {}
+    for name, compiler in compilers.items():
+        compiler.setup_query()
+        converters = compiler.get_converters([s[0] for s in compiler.select])
+
+        def run(compiler=compiler, converters=converters):
+            return [tuple(row) for row in compiler.apply_converters(rows, converters)]
+
+        results[name] = run()
+        elapsed = measure(run, args.repeat)
+        print(f"{name:>8}: {elapsed * 1000:8.1f} ms  {len(rows) / elapsed:12.0f} rows/s")
+
+    assert results["django"] == results["vinyl"], "converted rows differ"
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,37 @@
+import django
+from django.conf import settings
+
+
+def setup(name=":memory:", **options):
+    """
+    Configure django against a sqlite database (in-memory by default) and
+    create the tables of the benchmark models. The vinyl alias goes through
+    benchmarks.backend; it shares the tables unless the database is in-memory.
+    """
+    if not settings.configured:
+        settings.configure(
+            DATABASES={
+                "default": {
+                    "ENGINE": "django.db.backends.sqlite3",
+                    "NAME": name,
+                    "OPTIONS": {"timeout": 30},
+                },
+                "vinyl_default": {
+                    "ENGINE": "benchmarks.backend",
+                    "NAME": name,
+                    "OPTIONS": {"timeout": 30},
+                },
+            },
+            INSTALLED_APPS=["vinyl", "benchmarks"],
+            DEFAULT_AUTO_FIELD="django.db.models.BigAutoField",
+            USE_TZ=True,
+            **options,
+        )
+        django.setup()
+
+    from django.apps import apps
+    from django.db import connection
+
+    with connection.schema_editor() as editor:
+        for model in apps.get_app_config("benchmarks").get_models():
+            editor.create_model(model)
@@ -0,0 +1,99 @@
+"""
+Report the memory held by the materialized results: the bytes per instance
+of every benchmark model, loaded with the django ORM and with vinyl.
+
+    python -m benchmarks.memory [--rows 10000] [--json memory.json]
+
+The footprint is measured with tracemalloc: the memory still allocated once
+the results are loaded, divided by the number of instances. It includes the
+list holding them. The objects are the same in the sync and async modes of
+vinyl, so only the sync mode is measured.
+"""
+import argparse
+import gc
+import json
+import os
+import tempfile
+import tracemalloc
+
+from benchmarks.env import setup
+
+
+def measure_footprint(load):
+    """
+    Return (bytes per object, number of objects) of the list returned by
+    load(). load() is called once beforehand so that the caches it fills
+    (compiled queries, populators...) aren't counted.
+    """
+    load()
+    gc.collect()
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        objects = load()
+        gc.collect()
+        after = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    return (after - before) / len(objects), len(objects)
+
+
+def get_loads():
+    """
+    Return {(model, implementation): load function}.
+    """
+    from benchmarks.models import Author, Book, Mixed
+
+    return {
+        ("Mixed", "django"): lambda: list(Mixed.objects.all()),
+        ("Mixed", "vinyl"): lambda: list(Mixed.vinyl.all()),
+        ("Author", "django"): lambda: list(Author.objects.all()),
+        ("Author", "vinyl"): lambda: list(Author.vinyl.all()),
+        ("Book", "django"): lambda: list(Book.objects.all()),
+        ("Book", "vinyl"): lambda: list(Book.vinyl.all()),
+        ("Book+author", "django"): lambda: list(Book.objects.prefetch_related("author")),
+        ("Book+author", "vinyl"): lambda: list(Book.vinyl.prefetch("author")),
+        ("Author+books", "django"): lambda: list(Author.objects.prefetch_related("books")),
+        ("Author+books", "vinyl"): lambda: list(Author.vinyl.prefetch("books")),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=10_000)
+    parser.add_argument("--json", help="write the results to this file")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        setup(name=os.path.join(tmp, "benchmarks.sqlite3"))
+
+        from benchmarks import converters, orm
+        from vinyl import set_async
+
+        set_async(False)
+        converters.populate(args.rows)
+        orm.populate(args.rows // 10, 10)
+
+        results = []
+        for (model, implementation), load in get_loads().items():
+            per_object, count = measure_footprint(load)
+            results.append({
+                "model": model,
+                "implementation": implementation,
+                "objects": count,
+                "bytes_per_object": round(per_object),
+            })
+
+    print(f"{'model':<14} {'implementation':<14} {'objects':>8} {'bytes/object':>13}")
+    for r in results:
+        print(
+            f"{r['model']:<14} {r['implementation']:<14} {r['objects']:>8} "
+            f"{r['bytes_per_object']:>13}"
+        )
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"meta": orm.get_meta(args), "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
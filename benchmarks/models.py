@@ -0,0 +1,33 @@
+from django.db import models
+
+from vinyl.manager import VinylManager
+
+
+class Mixed(models.Model):
+    """
+    A row with one column of every commonly converted type.
+    """
+    title = models.CharField(max_length=50)
+    number = models.IntegerField()
+    flag = models.BooleanField()
+    created = models.DateTimeField()
+    day = models.DateField()
+    price = models.DecimalField(max_digits=10, decimal_places=2)
+    uid = models.UUIDField()
+    data = models.JSONField()
+
+    vinyl = VinylManager()
+
+
+class Author(models.Model):
+    name = models.CharField(max_length=50)
+
+    vinyl = VinylManager()
+
+
+class Book(models.Model):
+    title = models.CharField(max_length=50)
+    price = models.FloatField()
+    author = models.ForeignKey(Author, models.CASCADE, related_name="books")
+
+    vinyl = VinylManager()
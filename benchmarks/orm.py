@@ -0,0 +1,379 @@
+"""
+Compare the django ORM, vinyl in sync mode and vinyl in async mode on the
+common operations: get by pk, list with prefetch, insert, update, delete,
+count, and the resolution of the urls.
+
+    python -m benchmarks.orm [--authors 100] [--books-per-author 10]
+                             [--number 2000] [--concurrency 20] [--json results.json]
+
+For every implementation and operation it reports the operations per second
+run one after the other, the bytes allocated per operation (the tracemalloc
+peak) and the p50/p99 latencies with `concurrency` operations in flight:
+threads for the sync implementations, tasks for vinyl in async mode.
+
+The database is a sqlite file in a temporary directory. vinyl goes through
+the stand-in async driver of benchmarks.backend, see there. It shares a
+single sqlite connection: the concurrent operations of vinyl in async mode
+are serialized on it, so their p50/p99 mostly measure the queueing.
+
+Runs on django 4.1 only: on 4.2 VinylQuery.get_count() fails, django
+removed the is_summary argument it passes to add_annotation().
+"""
+import argparse
+import asyncio
+import collections
+import json
+import os
+import platform
+import random
+import statistics
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.env import setup
+
+OPERATIONS = ["get", "list_prefetch", "insert", "update", "delete", "count", "resolve"]
+
+
+class Operations:
+    """
+    The operations of an implementation, called with the number of the run.
+    The coroutine functions are awaited.
+    """
+
+    def __init__(self, pks, resolver, paths):
+        self.pks = pks
+        self.resolver = resolver
+        self.paths = paths
+        # the books inserted by insert(), deleted by delete()
+        self.inserted = collections.deque()
+
+    def get_pk(self, i):
+        return self.pks[i % len(self.pks)]
+
+
+class DjangoOperations(Operations):
+
+    def get(self, i):
+        from benchmarks.models import Book
+
+        return Book.objects.get(pk=self.get_pk(i))
+
+    def list_prefetch(self, i):
+        from benchmarks.models import Author
+
+        return list(Author.objects.prefetch_related("books")[:20])
+
+    def insert(self, i):
+        from benchmarks.models import Book
+
+        book = Book.objects.create(title=f"new {i}", price=i, author_id=1)
+        self.inserted.append(book.pk)
+
+    def update(self, i):
+        from benchmarks.models import Book
+
+        return Book.objects.filter(pk=self.get_pk(i)).update(price=i)
+
+    def delete(self, i):
+        from benchmarks.models import Book
+
+        return Book.objects.filter(pk=self.inserted.pop()).delete()
+
+    def count(self, i):
+        from benchmarks.models import Book
+
+        return Book.objects.filter(price__gt=i % 100).count()
+
+    def resolve(self, i):
+        method, path = self.paths[i % len(self.paths)]
+        return self.resolver.resolve(path)
+
+
+class VinylSyncOperations(Operations):
+
+    def get(self, i):
+        from benchmarks.models import Book
+
+        return Book.vinyl.get(pk=self.get_pk(i))
+
+    def list_prefetch(self, i):
+        from benchmarks.models import Author
+
+        return list(Author.vinyl.prefetch("books")[:20])
+
+    def insert(self, i):
+        from benchmarks.models import Book
+
+        book = Book.vinyl.model(title=f"new {i}", price=i, author_id=1)
+        book.insert()
+        self.inserted.append(book.pk)
+
+    def update(self, i):
+        from benchmarks.models import Book
+
+        return Book.vinyl.filter(pk=self.get_pk(i)).update(price=i)
+
+    def delete(self, i):
+        from benchmarks.models import Book
+
+        return Book.vinyl.delete_objects([Book.vinyl.model(pk=self.inserted.pop())])
+
+    def count(self, i):
+        from benchmarks.models import Book
+
+        return Book.vinyl.filter(price__gt=i % 100).count()
+
+    def resolve(self, i):
+        method, path = self.paths[i % len(self.paths)]
+        return self.resolver.resolve(path, method)
+
+
+class VinylAsyncOperations(VinylSyncOperations):
+
+    async def get(self, i):
+        return await super().get(i)
+
+    async def list_prefetch(self, i):
+        from benchmarks.models import Author
+
+        return await Author.vinyl.prefetch("books")[:20]
+
+    async def insert(self, i):
+        from benchmarks.models import Book
+
+        book = Book.vinyl.model(title=f"new {i}", price=i, author_id=1)
+        await book.insert()
+        self.inserted.append(book.pk)
+
+    async def update(self, i):
+        return await super().update(i)
+
+    async def delete(self, i):
+        return await super().delete(i)
+
+    async def count(self, i):
+        return await super().count(i)
+
+    async def resolve(self, i):
+        # No I/O: the same as in sync mode, run on the event loop.
+        return super().resolve(i)
+
+
+def populate(authors, books_per_author):
+    from benchmarks.models import Author, Book
+
+    Author.objects.bulk_create([Author(name=f"author {i}") for i in range(authors)])
+    Book.objects.bulk_create(
+        [
+            Book(title=f"book {i}", price=i % 100, author_id=i % authors + 1)
+            for i in range(authors * books_per_author)
+        ],
+        batch_size=1000,
+    )
+    return list(Book.objects.values_list("pk", flat=True))
+
+
+def measure_throughput(fn, number):
+    start = time.perf_counter()
+    for i in range(number):
+        fn(i)
+    return number / (time.perf_counter() - start)
+
+
+async def ameasure_throughput(fn, number):
+    start = time.perf_counter()
+    for i in range(number):
+        await fn(i)
+    return number / (time.perf_counter() - start)
+
+
+def measure_allocations(fn, number):
+    """
+    Return the mean of the tracemalloc peaks of the calls, in bytes.
+    """
+    peaks = []
+    tracemalloc.start()
+    try:
+        for i in range(number):
+            tracemalloc.reset_peak()
+            before = tracemalloc.get_traced_memory()[0]
+            fn(i)
+            peaks.append(tracemalloc.get_traced_memory()[1] - before)
+    finally:
+        tracemalloc.stop()
+    return statistics.mean(peaks)
+
+
+async def ameasure_allocations(fn, number):
+    peaks = []
+    tracemalloc.start()
+    try:
+        for i in range(number):
+            tracemalloc.reset_peak()
+            before = tracemalloc.get_traced_memory()[0]
+            await fn(i)
+            peaks.append(tracemalloc.get_traced_memory()[1] - before)
+    finally:
+        tracemalloc.stop()
+    return statistics.mean(peaks)
+
+
+def measure_latencies(fn, number, concurrency, is_async):
+    from vinyl import set_async
+
+    def timed(i):
+        start = time.perf_counter()
+        fn(i)
+        return time.perf_counter() - start
+
+    with ThreadPoolExecutor(concurrency, initializer=set_async, initargs=(is_async,)) as executor:
+        return list(executor.map(timed, range(number)))
+
+
+async def ameasure_latencies(fn, number, concurrency):
+    latencies = []
+    runs = iter(range(number))
+
+    async def worker():
+        for i in runs:
+            start = time.perf_counter()
+            await fn(i)
+            latencies.append(time.perf_counter() - start)
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return latencies
+
+
+def get_percentiles(latencies):
+    quantiles = statistics.quantiles(latencies, n=100)
+    return quantiles[49] * 1000, quantiles[98] * 1000
+
+
+def run_sync(name, operations, args):
+    from vinyl import set_async
+
+    set_async(False)
+    results = []
+    for op in OPERATIONS:
+        fn = getattr(operations, op)
+        ops_per_sec = measure_throughput(fn, args.number)
+        latencies = measure_latencies(fn, args.number, args.concurrency, False)
+        alloc = measure_allocations(fn, args.alloc_number)
+        results.append(make_result(name, op, ops_per_sec, alloc, latencies))
+    return results
+
+
+def run_async(name, operations, args):
+    from vinyl import set_async
+
+    async def run():
+        results = []
+        for op in OPERATIONS:
+            fn = getattr(operations, op)
+            ops_per_sec = await ameasure_throughput(fn, args.number)
+            latencies = await ameasure_latencies(fn, args.number, args.concurrency)
+            alloc = await ameasure_allocations(fn, args.alloc_number)
+            results.append(make_result(name, op, ops_per_sec, alloc, latencies))
+        return results
+
+    # The stand-in driver calls sqlite on the event loop.
+    allow_async_unsafe = os.environ.get("DJANGO_ALLOW_ASYNC_UNSAFE")
+    os.environ["DJANGO_ALLOW_ASYNC_UNSAFE"] = "true"
+    set_async(True)
+    try:
+        return asyncio.run(run())
+    finally:
+        set_async(False)
+        if allow_async_unsafe is None:
+            del os.environ["DJANGO_ALLOW_ASYNC_UNSAFE"]
+        else:
+            os.environ["DJANGO_ALLOW_ASYNC_UNSAFE"] = allow_async_unsafe
+
+
+def make_result(implementation, operation, ops_per_sec, alloc, latencies):
+    p50, p99 = get_percentiles(latencies)
+    return {
+        "implementation": implementation,
+        "operation": operation,
+        "ops_per_sec": round(ops_per_sec, 1),
+        "alloc_bytes_per_op": round(alloc),
+        "p50_ms": round(p50, 3),
+        "p99_ms": round(p99, 3),
+    }
+
+
+def get_meta(args):
+    import sqlite3
+
+    import django
+
+    return {
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "django": django.get_version(),
+        # see the docstring of the module
+        "supported_django": "4.1",
+        "sqlite": sqlite3.sqlite_version,
+        "machine": platform.machine(),
+        "args": vars(args),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--authors", type=int, default=100)
+    parser.add_argument("--books-per-author", type=int, default=10)
+    parser.add_argument("--number", type=int, default=2000)
+    parser.add_argument("--alloc-number", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--routes", type=int, default=500)
+    parser.add_argument("--json", help="write the results to this file")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        setup(name=os.path.join(tmp, "benchmarks.sqlite3"))
+
+        from django.db import connection
+        from django.urls.resolvers import RegexPattern, URLResolver
+
+        from benchmarks.routing import make_urlconf
+        from vinyl.web.resolver import MyURLResolver
+
+        with connection.cursor() as cursor:
+            cursor.execute("PRAGMA journal_mode=WAL")
+        pks = populate(args.authors, args.books_per_author)
+        random.seed(0)
+        random.shuffle(pks)
+
+        urlconf, paths = make_urlconf(args.routes)
+        paths = random.choices(paths, k=args.number)
+        django_resolver = URLResolver(RegexPattern(r"^/"), urlconf)
+        vinyl_resolver = MyURLResolver(RegexPattern(r"^/"), urlconf)
+        vinyl_resolver.route_table  # compile outside of the measurement
+
+        results = [
+            *run_sync("django", DjangoOperations(pks, django_resolver, paths), args),
+            *run_sync("vinyl_sync", VinylSyncOperations(pks, vinyl_resolver, paths), args),
+            *run_async("vinyl_async", VinylAsyncOperations(pks, vinyl_resolver, paths), args),
+        ]
+
+    print(
+        f"{'implementation':<12} {'operation':<14} {'ops/s':>10} "
+        f"{'bytes/op':>10} {'p50 ms':>8} {'p99 ms':>8}"
+    )
+    for r in results:
+        print(
+            f"{r['implementation']:<12} {r['operation']:<14} {r['ops_per_sec']:>10.0f} "
+            f"{r['alloc_bytes_per_op']:>10} {r['p50_ms']:>8.3f} {r['p99_ms']:>8.3f}"
+        )
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"meta": get_meta(args), "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+Compare the compiled MyURLResolver, with and without the resolve cache,
+with the linear resolution on a generated urlconf.
+
+    python -m benchmarks.routing [--routes 500] [--number 20000]
+"""
+import argparse
+import random
+import sys
+import time
+import types
+
+from benchmarks.env import setup
+
+
+def view(request, **kwargs):
+    pass
+
+
+def make_urlconf(routes):
+    """
+    Build a urlconf module of `routes` patterns: a mix of static routes,
+    routes with converters and includes, half of them method-restricted.
+    """
+    from django.urls import include, path
+
+    from vinyl.web.declare import get, post
+
+    patterns = []
+    paths = []
+    resources = routes // 5
+    for i in range(resources):
+        name = f"resource{i}"
+        patterns += [
+            get(f"{name}/", view),
+            post(f"{name}/", view),
+            get(f"{name}/<int:pk>/", view),
+            path(f"{name}/<int:pk>/<slug:action>/", view),
+        ]
+        paths += [
+            ("get", f"/{name}/"),
+            ("post", f"/{name}/"),
+            ("get", f"/{name}/{i}/"),
+            ("get", f"/{name}/{i}/edit/"),
+        ]
+    for i in range(routes - len(patterns)):
+        patterns.append(path(f"api/v{i}/", include([path("items/<str:key>/", view)])))
+        paths.append(("get", f"/api/v{i}/items/k{i}/"))
+
+    module = types.ModuleType("benchmarks.generated_urls")
+    module.urlpatterns = patterns
+    sys.modules[module.__name__] = module
+    return module.__name__, paths
+
+
+def measure(resolve, paths, number):
+    start = time.perf_counter()
+    for method, path in paths[:number]:
+        resolve(path, method)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--routes", type=int, default=500)
+    parser.add_argument("--number", type=int, default=20000)
+    args = parser.parse_args()
+
+    setup()
+
+    from django.urls.resolvers import RegexPattern, URLResolver
+
+    from vinyl.web.resolver import MyURLResolver
+
+    urlconf, paths = make_urlconf(args.routes)
+    random.seed(0)
+    paths = random.choices(paths, k=args.number)
+
+    django_resolver = URLResolver(RegexPattern(r"^/"), urlconf)
+    resolver = MyURLResolver(RegexPattern(r"^/"), urlconf)
+    resolver.resolve_cache_size = 0
+    resolver.route_table  # compile outside of the measurement
+    cached_resolver = MyURLResolver(RegexPattern(r"^/"), urlconf)
+    cached_resolver.route_table
+
+    resolvers = {
+        "django": lambda path, method: django_resolver.resolve(path),
+        "linear": resolver._resolve,
+        "compiled": resolver.resolve,
+        "cached": cached_resolver.resolve,
+    }
+    for method, path in paths[:1000]:
+        expected, got = resolver._resolve(path, method), resolver.resolve(path, method)
+        assert (expected.func, expected.kwargs) == (got.func, got.kwargs), path
+
+    for name, resolve in resolvers.items():
+        elapsed = measure(resolve, paths, args.number)
+        print(f"{name:>10}: {args.number / elapsed:10.0f} resolves/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -16,7 +16,7 @@ setup(name="vinyl",
       version="0.1.0",
       author="Vitalii Abetkin",
       author_email="abvit89s@gmail.ru",
-      packages=find_packages(),
+      packages=find_packages(exclude=["benchmarks", "benchmarks.*", "tests", "tests.*"]),
       description="vinyl style",
       long_description=README,
       license="MIT",
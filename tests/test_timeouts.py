@@ -0,0 +1,107 @@
+"""
+The statement timeouts in async mode, over the sqlite stand-in driver of
+benchmarks.backend.
+
+    python -m unittest tests.test_timeouts
+"""
+import asyncio
+import os
+import tempfile
+import unittest
+from contextlib import asynccontextmanager
+from unittest import mock
+
+from benchmarks.env import setup
+
+# a file: the vinyl alias doesn't share an in-memory database
+tmp = tempfile.TemporaryDirectory()
+setup(name=os.path.join(tmp.name, "tests.sqlite3"))
+
+from django.db import connections
+
+from benchmarks.backend.base import AsyncConnection, AsyncCursor, DatabaseWrapper
+from benchmarks.models import Author
+from vinyl import set_async
+from vinyl.backend import QueryTimeout
+
+
+class SlowCursor(AsyncCursor):
+
+    async def execute(self, sql, params=()):
+        if sql.lstrip().upper().startswith("SELECT"):
+            # a statement the server takes long to complete
+            await asyncio.sleep(10)
+        return await super().execute(sql, params)
+
+
+class CancelAwareConnection(AsyncConnection):
+    """
+    A connection like the drivers': cancel() aborts the statement, and a
+    closed connection can't be used anymore.
+    """
+
+    def __init__(self, wrapper):
+        super().__init__(wrapper)
+        self.closed = False
+
+    def cursor(self):
+        if self.closed:
+            raise RuntimeError("connection is closed")
+        return SlowCursor(self.wrapper.get_cursor())
+
+    def cancel(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+
+class AtomicTimeoutTests(unittest.TestCase):
+
+    def setUp(self):
+        self.pooled = []
+
+        @asynccontextmanager
+        async def get_connection_from_pool(wrapper):
+            conn = CancelAwareConnection(wrapper)
+            self.pooled.append(conn)
+            yield conn
+
+        pool = mock.patch.object(
+            DatabaseWrapper, "get_connection_from_pool", get_connection_from_pool
+        )
+        # The stand-in driver calls sqlite on the event loop.
+        env = mock.patch.dict(os.environ, DJANGO_ALLOW_ASYNC_UNSAFE="true")
+        for patch in [pool, env]:
+            patch.start()
+            self.addCleanup(patch.stop)
+        set_async(True)
+        self.addCleanup(set_async, False)
+
+    def test_timeout_in_atomic(self):
+        async def run():
+            async with connections["vinyl_default"].atomic():
+                await Author.vinyl.all().timeout(0.05)
+
+        with self.assertRaises(QueryTimeout):
+            asyncio.run(run())
+        # the connection cancelled is discarded
+        self.assertTrue(all(conn.closed for conn in self.pooled))
+
+    def test_cancel_in_atomic(self):
+        async def run():
+            async with connections["vinyl_default"].atomic():
+                await Author.vinyl.all()
+
+        async def cancel():
+            task = asyncio.ensure_future(run())
+            await asyncio.sleep(0.05)
+            task.cancel()
+            await task
+
+        with self.assertRaises(asyncio.CancelledError):
+            asyncio.run(cancel())
+
+
+if __name__ == "__main__":
+    unittest.main()
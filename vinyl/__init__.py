@@ -1,5 +1,6 @@
 from django.db.models.base import ModelBase
 
+from vinyl.backend import deadline
 from vinyl.futures import is_async, set_async
 from vinyl.model import VinylModel
 
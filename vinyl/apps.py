@@ -0,0 +1,34 @@
+import logging
+import time
+
+from django.apps import AppConfig
+from django.conf import settings
+
+logger = logging.getLogger("vinyl")
+
+
+class VinylConfig(AppConfig):
+    """
+    Generates the vinyl models of all the installed models once the app
+    registry is ready. settings.VINYL_STARTUP_BUDGET (seconds) is the time
+    above which a warning is logged.
+    """
+    name = "vinyl"
+    startup_time = None
+
+    def ready(self):
+        from vinyl.meta import make_vinyl_models
+
+        start = time.perf_counter()
+        vinyl_models = make_vinyl_models()
+        self.startup_time = time.perf_counter() - start
+        budget = getattr(settings, "VINYL_STARTUP_BUDGET", None)
+        if budget is not None and self.startup_time > budget:
+            logger.warning(
+                "Generating %d vinyl models took %.3fs, over the %.3fs budget.",
+                len(vinyl_models), self.startup_time, budget,
+            )
+        else:
+            logger.debug(
+                "Generated %d vinyl models in %.3fs.", len(vinyl_models), self.startup_time
+            )
@@ -0,0 +1,157 @@
+import json
+
+try:
+    import pyarrow
+except ImportError:
+    pyarrow = None
+
+from django.conf import settings
+from django.db.models.query import ModelIterable
+
+from vinyl.columnar import ColumnarIterable
+from vinyl.futures import is_async
+
+
+def get_arrow_type(field):
+    """
+    Return the arrow type storing the values of a model (or output) field.
+    Types without an arrow counterpart are stored as strings.
+    """
+    while field.is_relation:
+        field = field.target_field
+    internal_type = field.get_internal_type()
+    if internal_type == "DecimalField":
+        if field.max_digits is None:
+            # unbounded, allowed on PostgreSQL and SQLite
+            return pyarrow.decimal128(38, field.decimal_places or 0)
+        return pyarrow.decimal128(field.max_digits, field.decimal_places)
+    if internal_type == "DateTimeField":
+        return pyarrow.timestamp("us", tz="UTC" if settings.USE_TZ else None)
+    return ARROW_TYPES.get(internal_type, pyarrow.string)()
+
+
+def to_string(value):
+    if value is None or isinstance(value, str):
+        return value
+    return str(value)
+
+
+def to_json(value):
+    if value is None:
+        return value
+    return json.dumps(value)
+
+
+if pyarrow is not None:
+    ARROW_TYPES = {
+        "AutoField": pyarrow.int32,
+        "BigAutoField": pyarrow.int64,
+        "SmallAutoField": pyarrow.int16,
+        "IntegerField": pyarrow.int32,
+        "BigIntegerField": pyarrow.int64,
+        "SmallIntegerField": pyarrow.int16,
+        "PositiveIntegerField": pyarrow.int64,
+        "PositiveBigIntegerField": pyarrow.uint64,
+        "PositiveSmallIntegerField": pyarrow.int32,
+        "FloatField": pyarrow.float64,
+        "BooleanField": pyarrow.bool_,
+        "DateField": pyarrow.date32,
+        "TimeField": lambda: pyarrow.time64("us"),
+        "DurationField": lambda: pyarrow.duration("us"),
+        "BinaryField": pyarrow.binary,
+    }
+
+
+class ArrowIterable(ColumnarIterable):
+    """
+    Iterable returned by QuerySet.to_arrow() that streams the rows as
+    arrow record batches of chunk_size rows, one per fetch from the cursor.
+    """
+
+    def get_objects(self):
+        schema, batches = self.iter_batches()
+        if not is_async():
+            # The reader is lazy: the rows are fetched as it is read.
+            return pyarrow.RecordBatchReader.from_batches(schema, batches)
+
+        async def get_objects():
+            # A reader can't await the fetches: read the batches beforehand.
+            return pyarrow.RecordBatchReader.from_batches(
+                schema, [batch async for batch in batches]
+            )
+
+        return get_objects()
+
+    def iter_batches(self):
+        """
+        Return the schema and a generator (an async one in async mode) of
+        the record batches.
+        """
+        queryset = self.queryset
+        compiler = queryset.query.get_compiler(using=queryset.db)
+        chunks = compiler.iter_chunks(self.chunk_size)
+        schema, make_batch = self.get_batch_maker(compiler)
+
+        def batches():
+            try:
+                for rows in chunks:
+                    yield make_batch(rows)
+            finally:
+                chunks.close()
+
+        async def abatches():
+            try:
+                async for rows in chunks:
+                    yield make_batch(rows)
+            finally:
+                await chunks.aclose()
+
+        return schema, abatches() if is_async() else batches()
+
+    def get_columns(self, compiler):
+        """
+        Return (name, index, nullable) for the exported columns.
+        """
+        if self.queryset._iterable_class is ModelIterable:
+            select_fields = compiler.klass_info["select_fields"]
+            columns = [
+                (compiler.select[i][0].target.attname, i, compiler.select[i][0].target.null)
+                for i in select_fields
+            ]
+            columns.extend(
+                (name, i, True) for name, i in compiler.annotation_col_map.items()
+            )
+            return columns
+        names, fields = self.get_names()
+        index_map = {name: idx for idx, name in enumerate(names)}
+        return [(f, index_map[f], True) for f in fields]
+
+    def get_batch_maker(self, compiler):
+        """
+        Return the schema and the function turning a chunk of rows into a
+        record batch.
+        """
+        columns = self.get_columns(compiler)
+        indexes = [i for _, i, _ in columns]
+        schema = pyarrow.schema([
+            pyarrow.field(name, get_arrow_type(compiler.select[i][0].output_field), nullable)
+            for name, i, nullable in columns
+        ])
+        preparers = [
+            to_json if compiler.select[i][0].output_field.get_internal_type() == "JSONField"
+            else to_string if pyarrow.types.is_string(field.type)
+            else None
+            for i, field in zip(indexes, schema)
+        ]
+        column_converters = self.get_column_converters(compiler)
+
+        def make_batch(rows):
+            arrays = []
+            chunk = self.convert_chunk(rows, indexes, column_converters)
+            for values, field, prepare in zip(chunk, schema, preparers):
+                if prepare:
+                    values = [prepare(v) for v in values]
+                arrays.append(pyarrow.array(values, type=field.type))
+            return pyarrow.RecordBatch.from_arrays(arrays, schema=schema)
+
+        return schema, make_batch
@@ -1,12 +1,40 @@
-from contextlib import asynccontextmanager, contextmanager
+import asyncio
+import inspect
+import time
+from contextlib import asynccontextmanager, contextmanager, suppress
 from contextvars import ContextVar
 from functools import cached_property
 
+from django.db import OperationalError
 from django.db.backends.base.base import BaseDatabaseWrapper as _BaseDatabaseWrapper
 
 from vinyl.futures import is_async
 
 
+class QueryTimeout(OperationalError):
+    pass
+
+
+# time.monotonic() value by which the statements must have completed
+current_deadline = ContextVar('deadline', default=None)
+
+
+@contextmanager
+def deadline(seconds):
+    """
+    Give the statements of the block seconds to complete, in total. Nested
+    deadlines can only shorten the outer one.
+    """
+    at = time.monotonic() + seconds
+    if (outer := current_deadline.get()) is not None:
+        at = min(at, outer)
+    token = current_deadline.set(at)
+    try:
+        yield
+    finally:
+        current_deadline.reset(token)
+
+
 class BaseDatabaseWrapper(_BaseDatabaseWrapper):
     CursorWrapper = None
 
@@ -16,26 +44,142 @@ class BaseDatabaseWrapper(_BaseDatabaseWrapper):
 
     sync_connection = None
 
-    def cursor_decorator(self, fn):
+    def cursor_decorator(self, fn, timeout=None):
         async def awrapper(*args, **kwargs):
+            seconds = self.get_timeout(timeout)
             async with self.cursor() as cursor:
-                val = fn(*args, cursor=cursor, **kwargs)
-                if not val:
-                    1
-                return await val
+                conn = self.async_connection.get()
+                # The deadline of the context is enforced by the client, only
+                # the timeout of the queryset is set on the server too.
+                timeout_sql = self.get_timeout_sql(None if timeout is None else seconds)
+                if timeout_sql:
+                    await cursor.execute(timeout_sql[0])
+                reset_sql = timeout_sql and timeout_sql[1]
+                cancelled = False
+                try:
+                    return await self.wait_statement(
+                        conn, fn(*args, cursor=cursor, **kwargs), seconds
+                    )
+                except (QueryTimeout, asyncio.CancelledError):
+                    cancelled = True
+                    raise
+                finally:
+                    if reset_sql and not cancelled:
+                        try:
+                            await cursor.execute(reset_sql)
+                        except Exception:
+                            await self.close_connection(conn)
 
         def wrapper(*args, **kwargs):
             if not is_async():
+                seconds = self.get_timeout(timeout)
                 with self.cursor() as cursor:
-                    val = fn(*args, cursor=cursor, **kwargs)
+                    timeout_sql = self.get_timeout_sql(seconds)
+                    if timeout_sql:
+                        cursor.execute(timeout_sql[0])
+                    if not (timeout_sql and timeout_sql[1]):
+                        return fn(*args, cursor=cursor, **kwargs)
+                    try:
+                        val = fn(*args, cursor=cursor, **kwargs)
+                    except Exception:
+                        # In an aborted transaction the reset fails too, don't
+                        # let it mask the error.
+                        with suppress(Exception):
+                            cursor.execute(timeout_sql[1])
+                        raise
+                    cursor.execute(timeout_sql[1])
                     return val
             return awrapper(*args, **kwargs)
 
         return wrapper
 
-    def cursor(self, fn=None):
+    async def wait_statement(self, conn, statement, seconds):
+        """
+        Await the statement running on the driver connection conn, within
+        seconds if not None. Cancel it on the server if the time is up or if
+        the task is cancelled.
+        """
+        try:
+            if seconds is None:
+                return await statement
+            return await asyncio.wait_for(statement, seconds)
+        except asyncio.TimeoutError as ex:
+            await self.cancel_query(conn)
+            raise QueryTimeout(
+                f"The statement didn't complete within {seconds:.3f}s."
+            ) from ex
+        except asyncio.CancelledError:
+            # The task is cancelled, e.g. the client disconnected:
+            # don't leave the statement running on the server.
+            await self.cancel_query(conn)
+            raise
+
+    def get_timeout(self, timeout=None):
+        """
+        Return the time a statement has to complete: the smallest of timeout
+        and the time left to the deadline of the context, or None. Raise
+        QueryTimeout if the deadline has passed already.
+        """
+        if (at := current_deadline.get()) is not None:
+            left = at - time.monotonic()
+            if left <= 0:
+                raise QueryTimeout("The deadline has passed.")
+            timeout = left if timeout is None else min(timeout, left)
+        return timeout
+
+    def get_timeout_sql(self, seconds):
+        if seconds is None:
+            return None
+        return self.statement_timeout_sql(seconds, local=self.in_transaction())
+
+    def statement_timeout_sql(self, timeout, local=False):
+        """
+        Return the statements setting and resetting the server-side timeout
+        of the statements of the session, or None if the backend has none.
+        With local, in a transaction, the reset statement is None where the
+        setting ends with the transaction.
+        """
+        ms = max(int(timeout * 1000), 1)
+        if self.vendor == 'postgresql':
+            if local:
+                return f'SET LOCAL statement_timeout = {ms}', None
+            return f'SET statement_timeout = {ms}', 'SET statement_timeout TO DEFAULT'
+        if self.vendor == 'mysql':
+            if getattr(self, 'mysql_is_mariadb', False):
+                return (
+                    f'SET SESSION max_statement_time = {ms / 1000}',
+                    'SET SESSION max_statement_time = DEFAULT',
+                )
+            return (
+                f'SET SESSION max_execution_time = {ms}',
+                'SET SESSION max_execution_time = DEFAULT',
+            )
+        return None
+
+    async def cancel_query(self, conn):
+        """
+        Ask the server to cancel the statement running on the driver
+        connection conn, then close it so that the pool discards it rather
+        than handing it out in an unknown state.
+        """
+        if cancel := getattr(conn, 'cancel', None):
+            try:
+                result = cancel()
+                if inspect.isawaitable(result):
+                    await result
+            except Exception:
+                pass
+        await self.close_connection(conn)
+
+    async def close_connection(self, conn):
+        if close := getattr(conn, 'close', None):
+            result = close()
+            if inspect.isawaitable(result):
+                await result
+
+    def cursor(self, fn=None, timeout=None):
         if callable(fn):
-            return self.cursor_decorator(fn)
+            return self.cursor_decorator(fn, timeout)
         if not is_async():
             return self.sync_cursor()
 
@@ -60,6 +204,82 @@ class BaseDatabaseWrapper(_BaseDatabaseWrapper):
                     self.async_connection.reset(token)
         return cursor()
 
+    @cached_property
+    def in_async_atomic(self):
+        return ContextVar('in_async_atomic', default=False)
+
+    def in_transaction(self):
+        if is_async():
+            return self.in_async_atomic.get()
+        return self.in_sync_atomic
+
+    def atomic(self):
+        """
+        Return a context manager (an async one in async mode) running the
+        block in a transaction on a single connection. The nested blocks
+        join the outer transaction.
+        """
+        if not is_async():
+            return self.sync_atomic()
+        return self.async_atomic()
+
+    # the wrappers are per thread, so a flag is enough in sync mode
+    in_sync_atomic = False
+
+    @contextmanager
+    def sync_atomic(self):
+        if self.in_sync_atomic:
+            yield
+            return
+        self.in_sync_atomic = True
+        try:
+            with self._sync_atomic():
+                yield
+        finally:
+            self.in_sync_atomic = False
+
+    @contextmanager
+    def _sync_atomic(self):
+        with self.sync_cursor() as cursor:
+            cursor.execute(self.ops.start_transaction_sql())
+            try:
+                yield
+            except BaseException:
+                cursor.execute(self.ops.end_transaction_sql(success=False))
+                raise
+            cursor.execute(self.ops.end_transaction_sql())
+
+    @asynccontextmanager
+    async def async_atomic(self):
+        if self.in_async_atomic.get():
+            yield
+            return
+        if self.async_pool is None:
+            await self.start_pool()
+        async with self.get_connection_from_pool() as conn:
+            token = self.async_connection.set(conn)
+            atomic_token = self.in_async_atomic.set(True)
+            try:
+                async with self.cursor() as cursor:
+                    await cursor.execute(self.ops.start_transaction_sql())
+                try:
+                    yield
+                except BaseException:
+                    try:
+                        async with self.cursor() as cursor:
+                            await cursor.execute(self.ops.end_transaction_sql(success=False))
+                    except Exception:
+                        # e.g. wait_statement() closed the connection after a
+                        # timeout: discard it and raise the original error.
+                        with suppress(Exception):
+                            await self.close_connection(conn)
+                    raise
+                async with self.cursor() as cursor:
+                    await cursor.execute(self.ops.end_transaction_sql())
+            finally:
+                self.in_async_atomic.reset(atomic_token)
+                self.async_connection.reset(token)
+
     def get_connection_from_pool(self, pool):
         """
         return async context manager
@@ -0,0 +1,202 @@
+import array
+import typing
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from vinyl.converters import get_column_converters
+from vinyl.futures import is_async
+from vinyl.iterables import BaseIterable
+
+
+# internal type -> (numpy dtype, array.array typecode)
+TYPECODES = {
+    "AutoField": ("int32", "i"),
+    "BigAutoField": ("int64", "q"),
+    "SmallAutoField": ("int16", "h"),
+    "IntegerField": ("int32", "i"),
+    "BigIntegerField": ("int64", "q"),
+    "SmallIntegerField": ("int16", "h"),
+    "PositiveIntegerField": ("int64", "q"),
+    "PositiveBigIntegerField": ("uint64", "Q"),
+    "PositiveSmallIntegerField": ("int32", "i"),
+    "FloatField": ("float64", "d"),
+    "BooleanField": ("bool", "B"),
+}
+
+
+def get_typecodes(field):
+    """
+    Return the (dtype, typecode) pair for an output field, or None if the
+    values can't be stored in a typed array.
+    """
+    while field.is_relation:
+        field = field.target_field
+    return TYPECODES.get(field.get_internal_type())
+
+
+class Column(typing.NamedTuple):
+    """
+    A fetched column: the typed array of the values and the mask of the
+    nulls (None if there are none). The null slots hold zeros.
+    """
+    values: object
+    mask: object
+
+    def to_numpy(self):
+        values = numpy.asarray(self.values)
+        if self.mask is None:
+            return values
+        return numpy.ma.masked_array(values, mask=numpy.asarray(self.mask, dtype=bool))
+
+
+class ColumnBuilder:
+    """
+    Accumulates the batches of a single column.
+    """
+
+    def __init__(self, typecodes, use_numpy):
+        self.typecodes = typecodes
+        self.use_numpy = use_numpy
+        self.chunks = []
+        self.masks = []
+        self.has_nulls = False
+
+    def add(self, values):
+        mask = None
+        if self.typecodes and None in values:
+            mask = [v is None for v in values]
+            values = [0 if v is None else v for v in values]
+            self.has_nulls = True
+        self.masks.append((mask, len(values)))
+        self.chunks.append(self.make_array(values))
+
+    def make_array(self, values):
+        if self.typecodes is None:
+            return list(values)
+        dtype, typecode = self.typecodes
+        if self.use_numpy:
+            return numpy.fromiter(values, dtype=dtype, count=len(values))
+        return array.array(typecode, values)
+
+    def build(self):
+        if self.typecodes is None:
+            values = [v for chunk in self.chunks for v in chunk]
+        elif self.use_numpy:
+            values = numpy.concatenate(self.chunks) if self.chunks else numpy.empty(
+                0, dtype=self.typecodes[0]
+            )
+        else:
+            values = array.array(self.typecodes[1])
+            for chunk in self.chunks:
+                values.extend(chunk)
+        return Column(values, self.build_mask())
+
+    def build_mask(self):
+        if not self.has_nulls:
+            return None
+        if self.use_numpy:
+            return numpy.concatenate([
+                numpy.zeros(length, dtype=bool) if mask is None else numpy.array(mask, dtype=bool)
+                for mask, length in self.masks
+            ])
+        mask = array.array("B")
+        for chunk_mask, length in self.masks:
+            mask.extend(bytes(length) if chunk_mask is None else chunk_mask)
+        return mask
+
+
+class ColumnarIterable(BaseIterable):
+    """
+    Iterable returned by QuerySet.as_arrays() that builds a dict of
+    column name -> Column out of the rows, fetching them chunk by chunk.
+    """
+    use_numpy = numpy is not None
+
+    def get_names(self):
+        queryset = self.queryset
+        query = queryset.query
+        names = [
+            *query.extra_select,
+            *query.values_select,
+            *query.annotation_select,
+        ]
+        if queryset._fields:
+            fields = [
+                *queryset._fields,
+                *(f for f in query.annotation_select if f not in queryset._fields),
+            ]
+        else:
+            fields = names
+        return names, fields
+
+    def get_objects(self):
+        queryset = self.queryset
+        compiler = queryset.query.get_compiler(using=queryset.db)
+        # The rows are fetched chunk_size at a time, see iter_chunks().
+        chunks = compiler.iter_chunks(self.chunk_size)
+        if not is_async():
+            return self.make_objects(compiler, chunks)
+        return self.amake_objects(compiler, chunks)
+
+    def get_column_converters(self, compiler):
+        """
+        Return {index: converters of the column}.
+        """
+        expressions = [s[0] for s in compiler.select[0 : compiler.col_count]]
+        return dict(get_column_converters(
+            compiler.get_converters(expressions), compiler.connection
+        ))
+
+    def convert_chunk(self, rows, indexes, column_converters):
+        """
+        Return the converted columns at `indexes` of a chunk of rows.
+        """
+        columns = list(zip(*rows))
+        chunk = []
+        for i in indexes:
+            values = columns[i]
+            for convert in column_converters.get(i, ()):
+                values = convert(values)
+            chunk.append(values)
+        return chunk
+
+    def get_builders(self, compiler):
+        names, fields = self.get_names()
+        index_map = {name: idx for idx, name in enumerate(names)}
+        indexes = [index_map[f] for f in fields]
+        builders = [
+            ColumnBuilder(get_typecodes(compiler.select[i][0].output_field), self.use_numpy)
+            for i in indexes
+        ]
+        return fields, indexes, builders
+
+    def make_objects(self, compiler, chunks):
+        fields, indexes, builders = self.get_builders(compiler)
+        column_converters = self.get_column_converters(compiler)
+        try:
+            for rows in chunks:
+                chunk = self.convert_chunk(rows, indexes, column_converters)
+                for builder, values in zip(builders, chunk):
+                    builder.add(values)
+        finally:
+            chunks.close()
+        return {
+            name: builder.build() for name, builder in zip(fields, builders)
+        }
+
+    async def amake_objects(self, compiler, chunks):
+        fields, indexes, builders = self.get_builders(compiler)
+        column_converters = self.get_column_converters(compiler)
+        try:
+            async for rows in chunks:
+                chunk = self.convert_chunk(rows, indexes, column_converters)
+                for builder, values in zip(builders, chunk):
+                    builder.add(values)
+        finally:
+            await chunks.aclose()
+        return {
+            name: builder.build() for name, builder in zip(fields, builders)
+        }
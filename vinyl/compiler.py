@@ -1,24 +1,37 @@
+import json
+import time
 import typing
+from contextlib import suppress
 
+import django
 from django.db import connections
 from django.db.models.sql import compiler as _compiler
 
-from vinyl.futures import later
+from vinyl import converters as _converters
+from vinyl import nplusone
+from vinyl import slow_queries
+from vinyl.futures import is_async, later
 
 from django.db.models.sql.compiler import *
 
 
 class ExecuteMixin:
+    converters_batch_size = 1000
 
     @property
     def execute_sql(self):
         connection = connections[self.using]
-        return connection.cursor(self._execute_sql)
+        timeout = getattr(self.query, 'timeout', None)
+        return connection.cursor(self._execute_sql, timeout=timeout)
 
-    def _execute_sql(self, result_type=MULTI, *, cursor):
+    def _execute_sql(self, result_type=MULTI, *, cursor, sql_params=None):
+        """
+        sql_params: the (sql, params) to execute instead of compiling the
+        query, e.g. the SQL compiled once with other params.
+        """
         result_type = result_type or NO_RESULTS
         try:
-            sql, params = self.as_sql()
+            sql, params = sql_params or self.as_sql()
             if not sql:
                 raise EmptyResultSet
         except EmptyResultSet:
@@ -27,6 +40,8 @@ class ExecuteMixin:
             else:
                 ret = None
             return later.value(ret)
+        self.executing(sql)
+        start = time.perf_counter()
         execute = cursor.execute(sql, params)
         fetchone = fetchall = None
         if result_type == SINGLE:
@@ -36,6 +51,7 @@ class ExecuteMixin:
 
         @later
         def execute_sql(_=execute, val=fetchone, rows=fetchall):
+            self.executed(sql, params, time.perf_counter() - start)
             if result_type == SINGLE:
                 if val:
                     return val[0:self.col_count]
@@ -49,6 +65,23 @@ class ExecuteMixin:
 
         return execute_sql()
 
+    def executing(self, sql):
+        if (log := nplusone.query_log.get()) is not None:
+            log.record(sql, getattr(self.query, 'proxy', None))
+
+    def executed(self, sql, params, duration):
+        if getattr(self.query, 'select_for_update', False):
+            # see slow_queries.LOCKING_RE
+            return
+        if slow_queries.should_sample(sql, duration):
+            slow_queries.sample(connections[self.using], sql, params, duration)
+
+    def apply_converters(self, rows, converters):
+        "Apply converters column by column, in batches."
+        return _converters.apply_converters(
+            rows, converters, self.connection, self.converters_batch_size
+        )
+
 
 class SQLCompiler(ExecuteMixin, _compiler.SQLCompiler):
 
@@ -62,6 +95,97 @@ class SQLCompiler(ExecuteMixin, _compiler.SQLCompiler):
                 rows = map(tuple, rows)
         return rows
 
+    def explain_query(self):
+        """
+        Return the lines of the plan.
+        """
+        rows = self.execute_sql(MULTI)
+
+        @later
+        def explain_query(rows=rows):
+            # Some backends return 1 item tuples with strings, and others return
+            # tuples with integers and strings. Flatten them out into strings.
+            format_ = self.query.explain_info.format
+            output_formatter = json.dumps if format_ and format_.lower() == "json" else str
+            return [
+                row if isinstance(row, str) else " ".join(output_formatter(c) for c in row)
+                for row in rows
+            ]
+
+        return explain_query()
+
+    def iter_chunks(self, chunk_size):
+        """
+        Execute the query and yield the rows in lists of at most chunk_size,
+        fetching them from the cursor as they are consumed. Return an async
+        generator in async mode.
+        """
+        try:
+            sql, params = self.as_sql()
+            if not sql:
+                raise EmptyResultSet
+        except EmptyResultSet:
+            sql = params = None
+        connection = connections[self.using]
+        if is_async():
+            return self._aiter_chunks(connection, sql, params, chunk_size)
+        return self._iter_chunks(connection, sql, params, chunk_size)
+
+    def _iter_chunks(self, connection, sql, params, chunk_size):
+        if sql is None:
+            return
+        timeout = getattr(self.query, 'timeout', None)
+        seconds = connection.get_timeout(timeout)
+        with connection.cursor() as cursor:
+            timeout_sql = connection.get_timeout_sql(seconds)
+            if timeout_sql:
+                cursor.execute(timeout_sql[0])
+            try:
+                self.executing(sql)
+                start = time.perf_counter()
+                cursor.execute(sql, params)
+                self.executed(sql, params, time.perf_counter() - start)
+            finally:
+                if timeout_sql and timeout_sql[1]:
+                    with suppress(Exception):
+                        cursor.execute(timeout_sql[1])
+            # Closing the generator (e.g. the client disconnected) exits the
+            # cursor block and releases the cursor.
+            while rows := cursor.fetchmany(chunk_size):
+                yield rows
+
+    async def _aiter_chunks(self, connection, sql, params, chunk_size):
+        if sql is None:
+            return
+        timeout = getattr(self.query, 'timeout', None)
+        seconds = connection.get_timeout(timeout)
+        async with connection.cursor() as cursor:
+            conn = connection.async_connection.get()
+            timeout_sql = connection.get_timeout_sql(None if timeout is None else seconds)
+            if timeout_sql:
+                await cursor.execute(timeout_sql[0])
+            try:
+                self.executing(sql)
+                start = time.perf_counter()
+                await connection.wait_statement(conn, cursor.execute(sql, params), seconds)
+                self.executed(sql, params, time.perf_counter() - start)
+            finally:
+                if timeout_sql and timeout_sql[1]:
+                    try:
+                        await cursor.execute(timeout_sql[1])
+                    except Exception:
+                        await connection.close_connection(conn)
+            # Closing the generator (e.g. the client disconnected) exits the
+            # cursor block and releases the connection.
+            while True:
+                # the deadline of the context applies to the fetches too
+                rows = await connection.wait_statement(
+                    conn, cursor.fetchmany(chunk_size), connection.get_timeout()
+                )
+                if not rows:
+                    break
+                yield rows
+
     def has_results(self):
         """
         Backends (e.g. NoSQL) can override this in order to use optimized
@@ -98,10 +222,20 @@ class SQLInsertCompiler(ExecuteMixin, _compiler.SQLInsertCompiler):
     @property
     def execute_sql(self):
         connection = connections[self.using]
-        return connection.cursor(self._execute_sql)
+        timeout = getattr(self.query, 'timeout', None)
+        return connection.cursor(self._execute_sql, timeout=timeout)
 
     #FIXME self.connection
 
+    if django.VERSION < (4, 2):
+        def as_sql(self):
+            # Django 4.1 expects the columns of the ON CONFLICT clause, 4.2
+            # the fields (see VinylQuerySet.upsert()).
+            query = self.query
+            query.update_fields = [getattr(f, "column", f) for f in query.update_fields]
+            query.unique_fields = [getattr(f, "column", f) for f in query.unique_fields]
+            return super().as_sql()
+
     def _execute_sql(self, returning_fields=None, *, cursor):
         assert not (
             returning_fields
@@ -111,6 +245,7 @@ class SQLInsertCompiler(ExecuteMixin, _compiler.SQLInsertCompiler):
         opts = self.query.get_meta()
         self.returning_fields = returning_fields
         [(sql, params)] = self.as_sql()
+        self.executing(sql)
         execute = cursor.execute(sql, params)
 
         if not self.returning_fields:
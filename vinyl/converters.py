@@ -0,0 +1,232 @@
+"""
+Column-wise application of the db converters.
+
+Instead of calling every converter per cell, the rows are transposed in
+batches and each converter is applied to a whole column at once. The
+converters of the builtin backends that are hot in practice have
+specialized column versions, the rest go through map().
+"""
+import datetime
+import decimal
+import json
+import uuid
+from itertools import islice, repeat
+
+from django.conf import settings
+from django.db.models.expressions import Col
+from django.db.models.fields.json import KeyTransform
+
+
+column_converters = {}
+
+
+def register(*paths):
+    """
+    Register a column converter factory for the converters with the given
+    dotted paths. The factory is called as factory(converter, expression,
+    connection) and returns a function converting a list of values, or
+    None to fall back to the generic path.
+    """
+    def decorator(factory):
+        for path in paths:
+            column_converters[path] = factory
+        return factory
+
+    return decorator
+
+
+def get_path(converter):
+    func = getattr(converter, "__func__", converter)
+    return f"{func.__module__}.{func.__qualname__}"
+
+
+def get_column_converter(converter, expression, connection):
+    """
+    Return a function converting a list of values with the converter.
+    """
+    if factory := column_converters.get(get_path(converter)):
+        if convert := factory(converter, expression, connection):
+            return convert
+
+    def convert(values):
+        return list(map(converter, values, repeat(expression), repeat(connection)))
+
+    return convert
+
+
+def get_column_converters(converters, connection):
+    """
+    Turn the {position: (converters, expression)} dict returned by
+    SQLCompiler.get_converters() into a list of (position, column converters).
+    """
+    return [
+        (pos, [get_column_converter(c, expression, connection) for c in convs])
+        for pos, (convs, expression) in converters.items()
+    ]
+
+
+def convert_columns(columns, column_converters):
+    for pos, convs in column_converters:
+        values = columns[pos]
+        for convert in convs:
+            values = convert(values)
+        columns[pos] = values
+    return columns
+
+
+def apply_converters(rows, converters, connection, batch_size):
+    """
+    Yield the converted rows as tuples.
+    """
+    column_converters = get_column_converters(converters, connection)
+    rows = iter(rows)
+    while batch := list(islice(rows, batch_size)):
+        columns = convert_columns(list(zip(*batch)), column_converters)
+        yield from zip(*columns)
+
+
+@register(
+    "django.db.backends.sqlite3.operations.DatabaseOperations.convert_booleanfield_value",
+    "django.db.backends.mysql.operations.DatabaseOperations.convert_booleanfield_value",
+)
+def convert_booleans(converter, expression, connection):
+    get = {0: False, 1: True}.get
+
+    def convert(values):
+        return list(map(get, values, values))
+
+    return convert
+
+
+@register(
+    "django.db.backends.sqlite3.operations.DatabaseOperations.convert_uuidfield_value",
+    "django.db.backends.mysql.operations.DatabaseOperations.convert_uuidfield_value",
+)
+def convert_uuids(converter, expression, connection):
+    UUID = uuid.UUID
+    new = object.__new__
+    set_attr = object.__setattr__
+    unknown = uuid.SafeUUID.unknown
+
+    def convert_one(value):
+        if value is None:
+            return value
+        if len(value) != 32:
+            return UUID(value)
+        # Skip UUID.__init__ for the plain hex form the backends store.
+        obj = new(UUID)
+        set_attr(obj, "int", int(value, 16))
+        set_attr(obj, "is_safe", unknown)
+        return obj
+
+    def convert(values):
+        return list(map(convert_one, values))
+
+    return convert
+
+
+@register(
+    "django.db.backends.sqlite3.operations.DatabaseOperations.convert_datetimefield_value",
+)
+def convert_datetimes(converter, expression, connection):
+    tz = connection.timezone if settings.USE_TZ else None
+    if hasattr(tz, "localize"):
+        # pytz timezones can't be attached with replace()
+        return None
+    fromisoformat = datetime.datetime.fromisoformat
+
+    def convert_one(value):
+        if value is None:
+            return value
+        if not isinstance(value, datetime.datetime):
+            try:
+                value = fromisoformat(value)
+            except (TypeError, ValueError):
+                return converter(value, expression, connection)
+        if tz is not None and value.utcoffset() is None:
+            value = value.replace(tzinfo=tz)
+        return value
+
+    def convert(values):
+        return list(map(convert_one, values))
+
+    return convert
+
+
+def parse_isoformat(cls, naive=False):
+    """
+    naive: drop the tzinfo of the parsed values, as django's parse_time() does.
+    """
+    def factory(converter, expression, connection):
+        fromisoformat = cls.fromisoformat
+
+        def convert_one(value):
+            if value is None or isinstance(value, cls):
+                return value
+            try:
+                value = fromisoformat(value)
+            except (TypeError, ValueError):
+                return converter(value, expression, connection)
+            if naive and value.tzinfo is not None:
+                value = value.replace(tzinfo=None)
+            return value
+
+        def convert(values):
+            return list(map(convert_one, values))
+
+        return convert
+
+    return factory
+
+
+register(
+    "django.db.backends.sqlite3.operations.DatabaseOperations.convert_datefield_value",
+)(parse_isoformat(datetime.date))
+
+register(
+    "django.db.backends.sqlite3.operations.DatabaseOperations.convert_timefield_value",
+)(parse_isoformat(datetime.time, naive=True))
+
+
+@register(
+    "django.db.backends.sqlite3.operations.DatabaseOperations"
+    ".get_decimalfield_converter.<locals>.converter",
+)
+def convert_decimals(converter, expression, connection):
+    create_decimal = decimal.Context(prec=15).create_decimal_from_float
+    if not isinstance(expression, Col):
+        def convert(values):
+            return [None if v is None else create_decimal(v) for v in values]
+
+        return convert
+
+    quantize_value = decimal.Decimal(1).scaleb(-expression.output_field.decimal_places)
+    context = expression.output_field.context
+
+    def convert(values):
+        return [
+            None if v is None else create_decimal(v).quantize(quantize_value, context=context)
+            for v in values
+        ]
+
+    return convert
+
+
+@register("django.db.models.fields.json.JSONField.from_db_value")
+def convert_json(converter, expression, connection):
+    if converter.__self__.decoder is not None or isinstance(expression, KeyTransform):
+        return None
+    decode = json.JSONDecoder().decode
+
+    def convert_one(value):
+        if value is None:
+            return value
+        try:
+            return decode(value)
+        except (json.JSONDecodeError, TypeError):
+            return converter(value, expression, connection)
+
+    def convert(values):
+        return list(map(convert_one, values))
+
+    return convert
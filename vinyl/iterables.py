@@ -1,7 +1,7 @@
 import operator
 from typing import Collection
 
-from django.db.models.query import get_related_populators
+from django.db.models.query import RelatedPopulator as _RelatedPopulator
 from django.db.models.sql.constants import GET_ITERATOR_CHUNK_SIZE
 from django.db.models.utils import create_namedtuple_class
 
@@ -53,7 +53,7 @@ class ModelIterable(BaseIterable):
         init_list = [
             f[0].target.attname for f in select[model_fields_start:model_fields_end]
         ]
-        related_populators = get_related_populators(klass_info, select, db)
+        related_populators = get_cached_related_populators(compiler, db)
         known_related_objects = [
             (
                 field,
@@ -95,6 +95,68 @@ class ModelIterable(BaseIterable):
             yield obj
 
 
+class RelatedPopulator(_RelatedPopulator):
+    """
+    RelatedPopulator building the vinyl model instances of the
+    select_related() relations.
+    """
+
+    def __init__(self, klass_info, select, db):
+        from vinyl.meta import make_vinyl_model
+
+        super().__init__(klass_info, select, db)
+        self.model_cls = make_vinyl_model(self.model_cls)
+        self.related_populators = get_related_populators(klass_info, select, db)
+
+
+def get_related_populators(klass_info, select, db):
+    return [
+        RelatedPopulator(rel_klass_info, select, db)
+        for rel_klass_info in klass_info.get("related_klass_infos", [])
+    ]
+
+
+# query shape -> related populators
+related_populators_cache = {}
+related_populators_cache_size = 256
+
+
+def get_shape(klass_info):
+    return (
+        klass_info["model"],
+        klass_info.get("field"),
+        klass_info.get("reverse"),
+        klass_info.get("from_parent"),
+        tuple(klass_info["select_fields"]),
+        tuple(map(get_shape, klass_info.get("related_klass_infos", ()))),
+    )
+
+
+def get_cached_related_populators(compiler, db):
+    """
+    Return the related populators of the query, shared by the queries with
+    the same shape: the same tree of select_related() relations over the
+    same columns.
+    """
+    klass_info, select = compiler.klass_info, compiler.select
+    if not klass_info.get("related_klass_infos"):
+        return []
+    if compiler.query._filtered_relations:
+        # the setters of filtered relations are specific to the query
+        return get_related_populators(klass_info, select, db)
+    key = (
+        db,
+        get_shape(klass_info),
+        tuple(getattr(col, "target", None) for col, *_ in select),
+    )
+    if (populators := related_populators_cache.get(key)) is None:
+        if len(related_populators_cache) >= related_populators_cache_size:
+            related_populators_cache.clear()
+        populators = get_related_populators(klass_info, select, db)
+        related_populators_cache[key] = populators
+    return populators
+
+
 class ValuesIterable(BaseIterable):
     """
     Iterable returned by QuerySet.values() that yields a dict for each row.
@@ -141,9 +203,9 @@ class ValuesListIterable(BaseIterable):
                 rowfactory = operator.itemgetter(*[index_map[f] for f in fields])
                 for row in compiler.convert_rows(rows):
                     yield rowfactory(row)
-        else:
-            for row in compiler.convert_rows(rows, tuple_expected=True):
-                yield row
+                return
+        for row in compiler.convert_rows(rows, tuple_expected=True):
+            yield row
 
 
 class NamedValuesListIterable(ValuesListIterable):
@@ -28,7 +28,6 @@ class VinylManagerDescriptor(ManagerDescriptor):
         assert self.manager
         if not self.manager.model:
             self.manager.model = make_vinyl_model(owner)
-            print('make')
         return self.manager
 
     def __set_name__(self, owner, name):
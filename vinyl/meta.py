@@ -1,4 +1,8 @@
-from django.db.models import ForeignKey, OneToOneField
+from django.apps import apps
+from django.db.models import ForeignKey, ManyToManyField, OneToOneField
+from django.db.models.fields.reverse_related import (
+    ManyToManyRel, ManyToOneRel, OneToOneRel,
+)
 from django.db.models.query_utils import DeferredAttribute
 
 from vinyl.model import ManagerProxy, FKeyProxy, VinylModel
@@ -22,23 +26,21 @@ def get_field(val):
 
 
 def copy_namespace(model):
-    print('copy', model)
+    """
+    Return the proxies to the relation descriptors of the Django model: the
+    forward foreign keys and the related managers, reverse ones included.
+    """
     ns = {}
-    model_vars = {
-        field.name: getattr(model, field.name)
-        for field in model._meta.fields
-    }
-    model_vars.update(vars(model))
-    for key, val in model_vars.items():
-        if field := get_field(val):
-            print(field)
-            if isinstance(field, (ForeignKey, OneToOneField)):
-                ns[field.name] = FKeyProxy(field.name, getattr(model, field.name))
-            elif 0:
-                pass
-            else:
-                # regular field
-                1
+    for field in model._meta.get_fields():
+        if isinstance(field, (ForeignKey, OneToOneField)):
+            ns[field.name] = FKeyProxy(field.name, getattr(model, field.name))
+        elif isinstance(field, ManyToManyField):
+            ns[field.name] = ManagerProxy(field.name, getattr(model, field.name))
+        elif isinstance(field, (ManyToOneRel, ManyToManyRel)) and not isinstance(
+            field, OneToOneRel
+        ):
+            if name := field.get_accessor_name():
+                ns[name] = ManagerProxy(name, getattr(model, name))
     return ns
 
 def copy2(model):
@@ -47,14 +49,37 @@ def copy2(model):
 
 
 def make_vinyl_model(model):
-    if hasattr(model, 'vinyl_model'):
-        return model.vinyl_model
+    # vars(): a child model must not get the vinyl model of its parent
+    if vinyl_model := vars(model).get('vinyl_model'):
+        return vinyl_model
     ns = copy_namespace(model)
+    ns['DoesNotExist'] = model.DoesNotExist
+    ns['MultipleObjectsReturned'] = model.MultipleObjectsReturned
     bases = (VinylModel,)
     newcls = model.vinyl_model = type(model.__name__, bases, ns)
     newcls._model = model
     return newcls
 
+
+def make_vinyl_models(models=None):
+    """
+    Generate the vinyl models of the given Django models (all the installed
+    ones by default) and bind the vinyl managers to them, so that nothing
+    is left to the first access. Return the vinyl models.
+    """
+    from vinyl.manager import VinylManagerDescriptor
+
+    if models is None:
+        models = apps.get_models()
+    vinyl_models = []
+    for model in models:
+        vinyl_model = make_vinyl_model(model)
+        for attr in vars(model).values():
+            if isinstance(attr, VinylManagerDescriptor) and not attr.manager.model:
+                attr.manager.model = vinyl_model
+        vinyl_models.append(vinyl_model)
+    return vinyl_models
+
 # def __new__(metacls, name, bases, namespace, *, model):
 #     MODULE = 'django.db.models.fields.related_descriptors'
 #     ns = dict(namespace)
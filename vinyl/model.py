@@ -1,6 +1,9 @@
+from django.db import connections, router
 from django.db.models import DEFERRED
+from django.db.models.sql.constants import MULTI
 from django.db.models.query_utils import DeferredAttribute
 
+from vinyl import iterables
 from vinyl.futures import gen, later
 from vinyl.queryset import VinylQuerySet
 
@@ -32,6 +35,14 @@ class ModelMixin:
         new._state.db = db
         return new
 
+    def load(self, *fields):
+        """
+        Load the deferred fields of the instance: all of them or the given ones.
+        Use VinylQuerySet.load_deferred() to load them for many instances at once.
+        """
+        qs = VinylQuerySet(model=self.__class__, using=self._state.db)
+        return qs.load_deferred([self], *fields)
+
 
 class VinylMetaD:
     def __get__(self, instance, owner):
@@ -73,6 +84,7 @@ class VinylMetaD:
 
 class Proxy:
     # extend_attr = None
+    owner = None  # the vinyl model
 
     def __init__(self, name, attr):
         self.name = name
@@ -80,55 +92,127 @@ class Proxy:
         #     attr = self.extend_attr(attr)
         self.attr = attr
 
+    def __set_name__(self, owner, name):
+        self.owner = owner
+
     def __get__(self, instance, owner):
         if not instance:
             return self.attr
         return self.attr.__get__(instance, owner._model)
 
 
+class PreparedGet:
+    """
+    get_or_none() by the value of a unique field, with the SQL compiled on
+    the first call and reused after that.
+    """
+
+    def __init__(self, model, field, using, proxy=None):
+        self.queryset = VinylQuerySet(model=model, using=using)
+        self.queryset.query.proxy = proxy
+        self.field = field
+        self.compiled = None  # (compiler, sql)
+
+    def compile(self, value, connection):
+        qs = self.queryset.filter(**{self.field.attname: value})
+        compiler = qs.query.get_compiler(using=qs.db)
+        sql, params = compiler.as_sql()
+        param = self.field.get_db_prep_value(value, connection)
+        if list(params) == [param]:
+            self.compiled = compiler, sql
+        return compiler, (sql, params)
+
+    def __call__(self, value):
+        queryset = self.queryset
+        connection = connections[queryset.db]
+        if self.compiled:
+            compiler, sql = self.compiled
+            sql_params = sql, (self.field.get_db_prep_value(value, connection),)
+        else:
+            compiler, sql_params = self.compile(value, connection)
+        rows = compiler.execute_sql(MULTI, sql_params=sql_params)
+
+        @later
+        def get(rows=rows):
+            objects = list(iterables.ModelIterable(queryset).make_objects(compiler, rows))
+            return objects[0] if objects else None
+
+        return get()
+
+
 class FKeyProxy(Proxy):
-    # class FKey:
-    #     def get_queryset(self, **hints):
-    #         qs = super().get_queryset(**hints)
-    #         qs._iterable_class = forbid_iteration(qs._iterable_class)
-    #         return qs
+    """
+    Proxy to a forward foreign key. Returns the related object, from the
+    fields cache if it has been loaded already (select_related, prefetching,
+    assignment), or fetched by the value of the foreign key.
+    """
+
+    def __init__(self, name, attr):
+        super().__init__(name, attr)
+        self.prepared_gets = {}  # db -> PreparedGet
 
     def __get__(self, instance, owner):
         if not instance:
             return super().__get__(instance, owner)
+        field = self.attr.field
+        try:
+            return later.value(field.get_cached_value(instance))
+        except KeyError:
+            pass
+        value = field.get_local_related_value(instance)
+        if None in value:
+            return later.value(None)
+        rel_obj = self.get_prepared_get(instance)(*value)
 
-        qs = self.attr.get_queryset(instance=instance)
-        qs = VinylQuerySet.clone(qs)
-        # Assuming the database enforces foreign keys, this won't fail.
-        return qs.filter(self.attr.field.get_reverse_related_filter(instance)).get_or_none()
+        @later
+        def get(rel_obj=rel_obj):
+            if rel_obj is not None:
+                field.set_cached_value(instance, rel_obj)
+                if not field.remote_field.multiple:
+                    field.remote_field.set_cached_value(rel_obj, instance)
+            return rel_obj
 
-    # def extend_attr(self, attr):
-    #     return add_mixin(self.FKey, attr)
+        return get()
 
-    def __getitem__(self, item):
-        return self.instance._prefetched_objects_cache[
-            self.field.remote_field.get_cache_name()
-        ]
+    def __set__(self, instance, value):
+        self.attr.__set__(instance, value)
+
+    def get_prepared_get(self, instance):
+        from vinyl.meta import make_vinyl_model
 
+        field = self.attr.field
+        db = router.db_for_read(field.related_model, instance=instance)
+        if not (prepared_get := self.prepared_gets.get(db)):
+            model = make_vinyl_model(field.related_model)
+            prepared_get = PreparedGet(model, field.target_field, db, proxy=self)
+            self.prepared_gets[db] = prepared_get
+        return prepared_get
 
 
 class ManagerProxy(Proxy):
-    # class RelatedMgr:
-        # def get_queryset(self):
-        #     qs = super().get_queryset()
-        #     qs._iterable_class = forbid_iteration(qs._iterable_class)
-        #     return qs
+    """
+    Proxy to a related manager (reverse foreign key or many-to-many). Returns
+    the related VinylQuerySet, evaluated from the prefetched objects if the
+    relation has been prefetched.
+    """
 
     def __get__(self, instance, owner):
         if not instance:
             return super().__get__(instance, owner)
         mgr = super().__get__(instance, owner)
-        qs = mgr.all()
-        from vinyl.queryset import VinylQuerySet
+        # The related managers return the prefetched objects from
+        # get_queryset(), so the queryset is built bypassing it.
+        qs = mgr._apply_rel_filters(super(type(mgr), mgr).get_queryset())
         qs = VinylQuerySet.clone(qs)
-        #     return qs
+        qs.query.proxy = self
+        cache_name = getattr(mgr, 'prefetch_cache_name', None)
+        if cache_name is None:
+            cache_name = mgr.field.remote_field.get_cache_name()
+        prefetched = getattr(instance, '_prefetched_objects_cache', None)
+        if prefetched and cache_name in prefetched:
+            qs._result_cache = list(prefetched[cache_name])
+            qs._prefetch_done = True
         return qs
-        # return add_mixin(self.RelatedMgr, mgr)
 
 
 class VinylModel(ModelMixin):
@@ -138,7 +222,6 @@ class VinylModel(ModelMixin):
     #TODO __init__?
     def __new__(cls, *args, **kwargs):
         ob = cls._model(*args, **kwargs)
-        ob._prefetch_cache = {}
         ob.__class__ = cls
         return ob
 
@@ -228,7 +311,7 @@ class VinylModel(ModelMixin):
         from vinyl.manager import _VinylManager
         manager = _VinylManager()
         from vinyl.meta import make_vinyl_model
-        model.manager = make_vinyl_model(cls._meta.model)
+        manager.model = make_vinyl_model(cls._meta.model)
         num_rows = manager._delete(
             [self],
             using=using,
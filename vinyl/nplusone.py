@@ -0,0 +1,146 @@
+"""
+Detection of the N+1 queries.
+
+In the block of detect_n_plus_one() (see NPlusOneMiddleware) the statements
+executed are recorded and grouped by shape: the SQL with the literals and
+the lists of placeholders normalized. The shapes executed more than
+threshold times are reported with the n_plus_one signal and logged as
+warnings, along with the relation proxy or the call site executing them and
+the prefetch() lookup that would avoid them.
+"""
+import logging
+import re
+import sys
+import typing
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.dispatch import Signal
+
+logger = logging.getLogger("vinyl")
+
+# Sent with label and findings.
+n_plus_one = Signal()
+
+# The QueryLog of the block, see detect_n_plus_one()
+query_log = ContextVar("query_log", default=None)
+
+# The frames of these packages are skipped looking for the call site.
+INTERNAL_PACKAGES = {"vinyl", "django", "asgiref", "asyncio", "contextlib", "concurrent"}
+
+STRING_RE = re.compile(r"'(?:[^']|'')*'")
+NUMBER_RE = re.compile(r"\b\d+(?:\.\d+)?\b")
+PLACEHOLDERS_RE = re.compile(r"\((?:\s*%s\s*,)+\s*%s\s*\)")
+
+
+def get_shape(sql):
+    sql = STRING_RE.sub("%s", sql)
+    sql = NUMBER_RE.sub("%s", sql)
+    return PLACEHOLDERS_RE.sub("(%s, ...)", sql)
+
+
+def get_call_site():
+    frame = sys._getframe(1)
+    while frame is not None:
+        package = frame.f_globals.get("__name__", "").partition(".")[0]
+        if package not in INTERNAL_PACKAGES:
+            code = frame.f_code
+            return f"{code.co_filename}:{frame.f_lineno} in {code.co_name}"
+        frame = frame.f_back
+    return None
+
+
+class QueryRecord(typing.NamedTuple):
+    sql: str
+    proxy: object  # FKeyProxy or ManagerProxy
+    call_site: str
+
+
+class Finding(typing.NamedTuple):
+    """
+    A shape of statement executed count times.
+    """
+    shape: str
+    count: int
+    proxy: object
+    call_sites: list  # [(call site, count)], the most frequent first
+
+    @property
+    def suggestion(self):
+        if self.proxy is not None:
+            model = self.proxy.owner.__name__
+            return (
+                f"add prefetch({self.proxy.name!r}) to the queryset loading the "
+                f"{model} instances, or the lookup leading to it "
+                f"(e.g. prefetch('...__{self.proxy.name}'))"
+            )
+        if self.shape.lstrip()[:6].upper() == "INSERT":
+            return "insert the objects at once with VinylQuerySet.insert_objects()"
+        return None
+
+    def __str__(self):
+        lines = [f"{self.count} x {self.shape}"]
+        if self.proxy is not None:
+            lines.append(f"  through {self.proxy.owner.__name__}.{self.proxy.name}")
+        lines.extend(f"  from {site} ({count} x)" for site, count in self.call_sites)
+        if suggestion := self.suggestion:
+            lines.append(f"  suggestion: {suggestion}")
+        return "\n".join(lines)
+
+
+class QueryLog:
+
+    def __init__(self):
+        self.records = []
+
+    def record(self, sql, proxy=None):
+        self.records.append(QueryRecord(sql, proxy, get_call_site()))
+
+    def find_repeated(self, threshold):
+        """
+        Return the findings for the shapes executed more than threshold
+        times, the most frequent first.
+        """
+        groups = {}
+        for record in self.records:
+            groups.setdefault(get_shape(record.sql), []).append(record)
+        findings = []
+        for shape, records in groups.items():
+            if len(records) <= threshold:
+                continue
+            proxies = Counter(r.proxy for r in records if r.proxy is not None)
+            call_sites = Counter(r.call_site for r in records if r.call_site)
+            findings.append(Finding(
+                shape,
+                len(records),
+                proxies.most_common(1)[0][0] if proxies else None,
+                call_sites.most_common(),
+            ))
+        findings.sort(key=lambda f: f.count, reverse=True)
+        return findings
+
+
+def get_threshold():
+    return getattr(settings, "VINYL_N_PLUS_ONE_THRESHOLD", 5)
+
+
+@contextmanager
+def detect_n_plus_one(label=None, threshold=None):
+    """
+    Record the statements executed in the block (e.g. a request) and
+    report the shapes repeated more than threshold times at its end.
+    """
+    if threshold is None:
+        threshold = get_threshold()
+    log = QueryLog()
+    token = query_log.set(log)
+    try:
+        yield log
+    finally:
+        query_log.reset(token)
+        if findings := log.find_repeated(threshold):
+            for finding in findings:
+                logger.warning("Possible N+1 query in %s: %s", label or "block", finding)
+            n_plus_one.send(sender=None, label=label, findings=findings)
@@ -1,13 +1,41 @@
+import asyncio
 import copy
+from contextlib import contextmanager
+from contextvars import ContextVar
 
+from django.conf import settings
 from django.core import exceptions
+from django.db import connections, router
 from django.db.models.constants import LOOKUP_SEP
 from django.db.models.query import normalize_prefetch_lookups
 
-from vinyl.futures import gen
+from vinyl.futures import gen, is_async
 
 
 
+# (relation, instance key) -> related objects, see use_prefetch_cache()
+prefetch_cache = ContextVar("prefetch_cache", default=None)
+
+
+@contextmanager
+def use_prefetch_cache():
+    """
+    Share the prefetched objects between the prefetches done in the block
+    (e.g. a request): the related objects of the instances prefetched
+    already are taken from the cache, only the missing ones are queried.
+    Doesn't apply to the Prefetch() lookups with a custom queryset.
+
+    The writes done in the block (insert, update(), delete_objects()...)
+    don't invalidate the cache: the prefetches after them may return the
+    related objects as they were before.
+    """
+    token = prefetch_cache.set({})
+    try:
+        yield
+    finally:
+        prefetch_cache.reset(token)
+
+
 @gen
 def prefetch_related_objects(model_instances, *related_lookups):
     """
@@ -54,23 +82,17 @@ def prefetch_related_objects(model_instances, *related_lookups):
                 obj_list = done_queries[prefetch_to]
                 continue
 
-            # Prepare objects:
+            # Check the objects. The caches of the prefetched objects are
+            # allocated when the first relation is stored into them.
             good_objects = True
             for obj in obj_list:
-                # Since prefetching can re-use instances, it is possible to have
-                # the same instance multiple times in obj_list, so obj might
-                # already be prepared.
-                if not hasattr(obj, "_prefetched_objects_cache"):
-                    try:
-                        obj._prefetched_objects_cache = {}
-                    except (AttributeError, TypeError):
-                        # Must be an immutable object from
-                        # values_list(flat=True), for example (TypeError) or
-                        # a QuerySet subclass that isn't returning Model
-                        # instances (AttributeError), either in Django or a 3rd
-                        # party. prefetch_related() doesn't make sense, so quit.
-                        good_objects = False
-                        break
+                if not hasattr(obj, "__dict__"):
+                    # Must be an immutable object from values_list(flat=True),
+                    # for example, or a QuerySet subclass that isn't
+                    # returning Model instances, either in Django or a 3rd
+                    # party. prefetch_related() doesn't make sense, so quit.
+                    good_objects = False
+                    break
             if not good_objects:
                 break
 
@@ -188,6 +210,13 @@ def prefetch_one_level(instances, prefetcher, lookup, level):
     # The 'values to be matched' must be hashable as they will be used
     # in a dictionary.
 
+    queryset = lookup.get_current_queryset(level)
+    reverse_field = None
+    if is_reverse_many_to_one_manager(prefetcher):
+        # Django's get_prefetch_queryset() iterates over the queryset to set
+        # the reverse relation: that is done below, once it's fetched.
+        reverse_field = prefetcher.field
+    chunk_size = get_prefetch_chunk_size(prefetcher, instances)
     (
         rel_qs,
         rel_obj_attr,
@@ -195,9 +224,7 @@ def prefetch_one_level(instances, prefetcher, lookup, level):
         single,
         cache_name,
         is_descriptor,
-    ) = prefetcher.get_prefetch_queryset(instances, lookup.get_current_queryset(level))
-    from vinyl.queryset import VinylQuerySet
-    rel_qs = VinylQuerySet.clone(rel_qs)
+    ) = get_prefetch_queryset(prefetcher, instances[:chunk_size], queryset)
     # We have to handle the possibility that the QuerySet we just got back
     # contains some prefetch_related lookups. We don't want to trigger the
     # prefetch_related functionality by evaluating the query. Rather, we need
@@ -208,19 +235,73 @@ def prefetch_one_level(instances, prefetcher, lookup, level):
         copy.copy(additional_lookup)
         for additional_lookup in getattr(rel_qs, "_prefetch_related_lookups", ())
     ]
-    if additional_lookups:
-        # Don't need to clone because the manager should have given us a fresh
-        # instance, so we access an internal instead of using public interface
-        # for performance reasons.
-        rel_qs._prefetch_related_lookups = ()
-
-    all_related_objects = yield rel_qs._fetch_all_()
 
+    # The request prefetch cache is only used for the default querysets,
+    # the results of the custom ones are specific to the lookup.
+    cache = prefetch_cache.get() if queryset is None else None
     rel_obj_cache = {}
+    to_fetch = instances
+    if cache is not None:
+        relation = (instances[0]._meta.concrete_model, cache_name, rel_qs.db)
+        to_fetch = []
+        for obj in instances:
+            key = instance_attr(obj)
+            try:
+                rel_obj_cache[key] = list(cache[relation, key])
+            except KeyError:
+                to_fetch.append(obj)
+
+    all_related_objects = []
+    if to_fetch:
+        if to_fetch is instances:
+            # rel_qs is the queryset of the first chunk.
+            querysets = [rel_qs]
+            fetched = {instance_attr(obj) for obj in instances[:chunk_size]}
+            rest = instances[chunk_size:]
+        else:
+            querysets = []
+            fetched = set()
+            rest = to_fetch
+        if rest:
+            # One instance per key: the instances with the same key (e.g. the
+            # same foreign key value) get the same related objects.
+            rest = list({
+                key: obj
+                for obj in rest
+                if (key := instance_attr(obj)) not in fetched
+            }.values())
+            querysets.extend(
+                get_prefetch_queryset(prefetcher, rest[i : i + chunk_size], queryset)[0]
+                for i in range(0, len(rest), chunk_size)
+            )
+        for qs in querysets:
+            # Don't need to clone because the manager should have given us a
+            # fresh instance, so we access an internal instead of using public
+            # interface for performance reasons.
+            qs._prefetch_related_lookups = ()
+        all_related_objects = yield fetch_all(querysets)
+
+    if reverse_field is not None:
+        instances_dict = {instance_attr(inst): inst for inst in instances}
+        for rel_obj in all_related_objects:
+            if not reverse_field.is_cached(rel_obj):
+                instance = instances_dict[rel_obj_attr(rel_obj)]
+                reverse_field.set_cached_value(rel_obj, instance)
+
     for rel_obj in all_related_objects:
         rel_attr_val = rel_obj_attr(rel_obj)
         rel_obj_cache.setdefault(rel_attr_val, []).append(rel_obj)
 
+    if cache is not None:
+        for obj in to_fetch:
+            key = instance_attr(obj)
+            # a tuple: the lists handed to the instances can be mutated
+            cache[relation, key] = tuple(rel_obj_cache.get(key, ()))
+        if len(to_fetch) < len(instances):
+            all_related_objects = [
+                rel_obj for rel_objs in rel_obj_cache.values() for rel_obj in rel_objs
+            ]
+
     to_attr, as_attr = lookup.get_current_to_attr(level)
     # Make sure `to_attr` does not conflict with a field.
     if as_attr and instances:
@@ -271,10 +352,109 @@ def prefetch_one_level(instances, prefetcher, lookup, level):
                 # # We don't want the individual qs doing prefetch_related now,
                 # # since we have merged this into the current work.
                 # qs._prefetch_done = True
-                obj._prefetched_objects_cache[cache_name] = vals
+                try:
+                    obj._prefetched_objects_cache[cache_name] = vals
+                except AttributeError:
+                    obj._prefetched_objects_cache = {cache_name: vals}
     return all_related_objects, additional_lookups
 
 
+def get_prefetch_chunk_size(prefetcher, instances):
+    """
+    The number of instances whose related objects are fetched by a single
+    query: settings.VINYL_PREFETCH_CHUNK_SIZE, capped by the number of
+    parameters the database accepts.
+    """
+    db = router.db_for_read(instances[0]._meta.model, instance=instances[0])
+    connection = connections[db]
+    chunk_size = getattr(settings, "VINYL_PREFETCH_CHUNK_SIZE", 1000)
+    return max(min(chunk_size, connection.ops.bulk_batch_size(["pk"], instances)), 1)
+
+
+def get_prefetch_concurrency():
+    return getattr(settings, "VINYL_PREFETCH_CONCURRENCY", 4)
+
+
+def fetch_all(querysets):
+    """
+    Fetch the querysets and return the list of all the objects.
+
+    In async mode at most settings.VINYL_PREFETCH_CONCURRENCY querysets are
+    fetched concurrently, each on a pooled connection. Inside a transaction
+    they are fetched one after the other on its connection.
+    """
+    if len(querysets) == 1:
+        return querysets[0]._fetch_all_()
+    if not is_async() or connections[querysets[0].db].async_connection.get():
+        return fetch_sequentially(querysets)
+
+    async def fetch_all():
+        semaphore = asyncio.Semaphore(get_prefetch_concurrency())
+
+        async def fetch(qs):
+            async with semaphore:
+                return await qs._fetch_all_()
+
+        tasks = [asyncio.ensure_future(fetch(qs)) for qs in querysets]
+        try:
+            results = await asyncio.gather(*tasks)
+        except BaseException:
+            # Don't leave the other chunks running on pooled connections.
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+        return [obj for objs in results for obj in objs]
+
+    return fetch_all()
+
+
+@gen
+def fetch_sequentially(querysets):
+    objs = []
+    for qs in querysets:
+        objs.extend((yield qs._fetch_all_()))
+    return objs
+
+
+def get_prefetch_queryset(prefetcher, instances, queryset):
+    if is_reverse_many_to_one_manager(prefetcher):
+        prefetch_queryset = get_reverse_many_to_one_prefetch_queryset(
+            prefetcher, instances, queryset
+        )
+    else:
+        prefetch_queryset = prefetcher.get_prefetch_queryset(instances, queryset)
+    from vinyl.queryset import VinylQuerySet
+
+    rel_qs, *rest = prefetch_queryset
+    return VinylQuerySet.clone(rel_qs), *rest
+
+
+def is_reverse_many_to_one_manager(prefetcher):
+    return type(prefetcher).__qualname__ == (
+        "create_reverse_many_to_one_manager.<locals>.RelatedManager"
+    )
+
+
+def get_reverse_many_to_one_prefetch_queryset(manager, instances, queryset=None):
+    """
+    The get_prefetch_queryset() of a reverse foreign key manager, without the
+    evaluation of the queryset.
+    """
+    if queryset is None:
+        queryset = super(type(manager), manager).get_queryset()
+
+    queryset._add_hints(instance=instances[0])
+    queryset = queryset.using(queryset._db or manager._db)
+
+    rel_obj_attr = manager.field.get_local_related_value
+    instance_attr = manager.field.get_foreign_related_value
+    query = {"%s__in" % manager.field.name: instances}
+    queryset = queryset.filter(**query)
+    cache_name = manager.field.remote_field.get_cache_name()
+    return queryset, rel_obj_attr, instance_attr, False, cache_name, False
+
+
 def get_prefetcher(instance, through_attr, to_attr):
     """
     For the attribute 'through_attr' on the given instance, find
@@ -330,7 +510,9 @@ def get_prefetcher(instance, through_attr, to_attr):
                 else:
 
                     def in_prefetched_cache(instance):
-                        return through_attr in instance._prefetched_objects_cache
+                        return through_attr in getattr(
+                            instance, "_prefetched_objects_cache", ()
+                        )
 
                     is_fetched = in_prefetched_cache
     return prefetcher, rel_obj_descriptor, attr_found, is_fetched
\ No newline at end of file
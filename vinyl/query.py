@@ -1,10 +1,33 @@
-from django.db.models import Count, sql
+from django.db.models import Count, Max, Min, sql
 from django.db.models.sql.constants import SINGLE
+from django.db.models.sql.query import EXPLAIN_OPTIONS_PATTERN, ExplainInfo
 
 from vinyl.futures import later
 
 
 class VinylQuery(sql.Query):
+    # seconds the statements have to complete, see VinylQuerySet.timeout()
+    timeout = None
+    # the FKeyProxy or ManagerProxy the query comes from, see vinyl.nplusone
+    proxy = None
+
+    def explain(self, using, format=None, **options):
+        q = self.clone()
+        for option_name in options:
+            if (
+                not EXPLAIN_OPTIONS_PATTERN.fullmatch(option_name)
+                or "--" in option_name
+            ):
+                raise ValueError(f"Invalid option name: {option_name!r}.")
+        q.explain_info = ExplainInfo(format, options)
+        compiler = q.get_compiler(using=using)
+        lines = compiler.explain_query()
+
+        @later
+        def explain(lines=lines):
+            return "\n".join(lines)
+
+        return explain()
 
     def get_count(self, using):
         """
@@ -23,6 +46,22 @@ class VinylQuery(sql.Query):
 
         return get_count()
 
+    def get_pk_range(self, using):
+        """
+        Return the (min, max) pair of the primary keys matching the current
+        filter constraints.
+        """
+        obj = self.clone()
+        obj.add_annotation(Min("pk"), alias="__pk_min", is_summary=True)
+        obj.add_annotation(Max("pk"), alias="__pk_max", is_summary=True)
+        result = obj.get_aggregation(using, ["__pk_min", "__pk_max"])
+
+        @later
+        def get_pk_range(result=result):
+            return result["__pk_min"], result["__pk_max"]
+
+        return get_pk_range()
+
     def get_aggregation(self, using, added_aggregate_names):
         """
         Return the dictionary with the values of the existing aggregations.
@@ -57,6 +96,7 @@ class VinylQuery(sql.Query):
             inner_query = self.clone()
             inner_query.subquery = True
             outer_query = AggregateQuery(self.model, inner_query)
+            outer_query.timeout = self.timeout
             inner_query.select_for_update = False
             inner_query.select_related = False
             inner_query.set_annotation_mask(self.annotation_select)
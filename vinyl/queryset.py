@@ -1,12 +1,19 @@
+import asyncio
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import django
 from django.db import connections, NotSupportedError
 from django.db.models import sql
 from django.db.models import QuerySet
-from django.db.models.sql.constants import CURSOR
-from django.db.models.query import MAX_GET_RESULTS
+from django.db.models.sql.constants import CURSOR, GET_ITERATOR_CHUNK_SIZE, MULTI
+from django.db.models.query import MAX_GET_RESULTS, ModelIterable
+from django.utils.functional import partition
 
-from vinyl import iterables
+from vinyl import arrow, columnar, iterables
 
-from vinyl.futures import later, is_async
+from vinyl.futures import gen, later, is_async, set_async
 from vinyl.prefetch import prefetch_related_objects
 from vinyl.query import VinylQuery
 
@@ -14,9 +21,16 @@ from vinyl.query import VinylQuery
 class VinylQuerySet(QuerySet):
     @classmethod
     def clone(cls, qs):
+        from vinyl.meta import make_vinyl_model
+        from vinyl.model import VinylModel
+
+        model = qs.model
+        query = qs.query.chain(klass=VinylQuery)
+        if model is not None and not issubclass(model, VinylModel):
+            model = query.model = make_vinyl_model(model)
         c = cls(
-            model=qs.model,
-            query=qs.query.chain(klass=VinylQuery),
+            model=model,
+            query=query,
             using=qs._db,
             hints=qs._hints,
         )
@@ -41,8 +55,7 @@ class VinylQuerySet(QuerySet):
 
     def __iter__(self):
         assert not is_async()
-        return self._fetch_all_()
-        # return iter(self._result_cache)
+        return iter(self._fetch_all_())
 
     def get_vinyl_iterable_class(self):
         return getattr(iterables, self._iterable_class.__name__)
@@ -50,7 +63,9 @@ class VinylQuerySet(QuerySet):
     #TODO drop _result_cache
     #TODO evaluate
     def _fetch_all_(self):
-        # if not (results := self._result_cache):
+        if self._result_cache is not None:
+            # e.g. the related querysets of prefetched relations
+            return later.value(self._result_cache)
         iterable_class = self.get_vinyl_iterable_class()
         results = iterable_class(self).get_objects()
 
@@ -65,6 +80,44 @@ class VinylQuerySet(QuerySet):
     def _fetch_all(self):
         "Do nothing."
 
+    def chunks(self, chunk_size=GET_ITERATOR_CHUNK_SIZE):
+        """
+        Iterate over the results in lists of at most chunk_size objects,
+        reading the rows from the cursor lazily. Prefetching is done per
+        chunk. Return an async iterator in async mode.
+        """
+        if chunk_size is None or chunk_size <= 0:
+            raise ValueError("Chunk size must be strictly positive.")
+        if not is_async():
+            return self._chunks(chunk_size)
+        return self._achunks(chunk_size)
+
+    def _chunks(self, chunk_size):
+        iterable = self.get_vinyl_iterable_class()(self, chunk_size=chunk_size)
+        compiler = self.query.get_compiler(using=self.db)
+        chunks = compiler.iter_chunks(chunk_size)
+        try:
+            for rows in chunks:
+                objects = list(iterable.make_objects(compiler, rows))
+                if self._prefetch_related_lookups:
+                    prefetch_related_objects(objects, *self._prefetch_related_lookups)
+                yield objects
+        finally:
+            chunks.close()
+
+    async def _achunks(self, chunk_size):
+        iterable = self.get_vinyl_iterable_class()(self, chunk_size=chunk_size)
+        compiler = self.query.get_compiler(using=self.db)
+        chunks = compiler.iter_chunks(chunk_size)
+        try:
+            async for rows in chunks:
+                objects = list(iterable.make_objects(compiler, rows))
+                if self._prefetch_related_lookups:
+                    await prefetch_related_objects(objects, *self._prefetch_related_lookups)
+                yield objects
+        finally:
+            await chunks.aclose()
+
     def __await__(self):
         return self._await().__await__()
 
@@ -95,6 +148,361 @@ class VinylQuerySet(QuerySet):
 
     _delete.queryset_only = False
 
+    def delete_objects(self, objs, batch_size=None, atomic=False):
+        """
+        Delete objs with a DELETE ... WHERE pk IN per batch and table: the
+        table of the model, then those of its multi-table parents. The
+        related objects are not collected, the database constraints apply.
+        Return the total and the per-model numbers of rows deleted, as
+        QuerySet.delete() does.
+        """
+        if batch_size is not None and batch_size <= 0:
+            raise ValueError("Batch size must be a positive integer.")
+        concrete_model = self.model._meta.concrete_model
+        connection = connections[self.db]
+        statements = []
+        for model in [concrete_model, *concrete_model._meta.get_parent_list()]:
+            pk = model._meta.pk
+            pk_list = list({
+                value for obj in objs if (value := getattr(obj, pk.attname)) is not None
+            })
+            max_batch_size = max(connection.ops.bulk_batch_size([pk], pk_list), 1)
+            size = min(batch_size, max_batch_size) if batch_size else max_batch_size
+            for i in range(0, len(pk_list), size):
+                query = sql.DeleteQuery(model)
+                query.add_filter(f"{pk.attname}__in", pk_list[i : i + size])
+                statements.append((model._meta.label, query))
+
+        def delete_objects():
+            counts = {}
+            for label, query in statements:
+                cursor = yield query.get_compiler(self.db).execute_sql(CURSOR)
+                counts[label] = counts.get(label, 0) + (cursor.rowcount if cursor else 0)
+            return sum(counts.values()), counts
+
+        return self._run_statements(delete_objects, atomic)
+
+    def update(self, **kwargs):
+        """
+        Update the rows of the queryset with a single UPDATE statement (one
+        per table for the fields of multi-table parents); the values can be
+        expressions, e.g. F("count") + 1. Return the number of rows updated.
+        """
+        return self._update_rows(kwargs)
+
+    def update_returning(self, fields, /, **kwargs):
+        """
+        Like update(), but return the list of the dicts of the given fields
+        in the updated rows, read with UPDATE ... RETURNING.
+        """
+        return self._update_rows(kwargs, fields)
+
+    def _update_rows(self, values, returning=()):
+        self._not_support_combined_queries("update")
+        if self.query.is_sliced:
+            raise TypeError("Cannot update a query once a slice has been taken.")
+        self._for_write = True
+        meta = self.model._meta
+        connection = connections[self.db]
+        returning_fields = [meta.get_field(name) for name in returning]
+        if returning_fields:
+            if connection.vendor not in ("postgresql", "sqlite"):
+                raise NotSupportedError(
+                    "This database backend does not support UPDATE ... RETURNING."
+                )
+            if any(f not in meta.local_concrete_fields for f in returning_fields):
+                raise ValueError(
+                    "update() can only return the concrete fields of the model's "
+                    "own table."
+                )
+        query = self.query.chain(sql.UpdateQuery)
+        query.add_update_values(values)
+        # Clear any annotations so that they won't be present in subqueries.
+        query.annotations = {}
+        related_updates, query.related_updates = query.related_updates, {}
+
+        # The ids to update are selected beforehand when the parents are
+        # updated too, or when the backend can't select from the updated
+        # table: SQLUpdateCompiler.pre_sql_setup() would do it synchronously.
+        query.get_initial_alias()
+        pre_select = related_updates or (
+            query.count_active_tables() > 1
+            and not connection.features.update_can_self_select
+        )
+        fields = ["pk"]
+        related_ids_index = []
+        for related in related_updates:
+            if all(path.join_field.primary_key for path in meta.get_path_to_parent(related)):
+                related_ids_index.append((related, 0))
+            else:
+                related_ids_index.append((related, len(fields)))
+                fields.append(related._meta.pk.name)
+
+        def update():
+            update_query = query
+            if pre_select:
+                rows = yield self.order_by().values_list(*fields)._fetch_all_()
+                # A fresh query: no joins left for pre_sql_setup() to resolve.
+                update_query = sql.UpdateQuery(self.model)
+                update_query.values = query.values
+                update_query.timeout = getattr(query, "timeout", None)
+                update_query.add_filter("pk__in", [row[0] for row in rows])
+            compiler = update_query.get_compiler(self.db)
+            if returning_fields:
+                updated = yield self._update_returning(compiler, returning_fields)
+                count = len(updated)
+            else:
+                cursor = yield compiler.execute_sql(CURSOR)
+                count = updated = cursor.rowcount if cursor else 0
+            for related, index in related_ids_index:
+                related_query = sql.UpdateQuery(related)
+                related_query.values = related_updates[related]
+                related_query.timeout = getattr(query, "timeout", None)
+                related_query.add_filter("pk__in", [row[index] for row in rows])
+                cursor = yield related_query.get_compiler(self.db).execute_sql(CURSOR)
+                if not count and not returning_fields and cursor:
+                    count = updated = cursor.rowcount
+            return updated
+
+        return gen(update)()
+
+    def _update_returning(self, compiler, returning_fields):
+        sql, params = compiler.as_sql()
+        if not sql:
+            return later.value([])
+        meta = self.model._meta
+        returning_sql, returning_params = compiler.connection.ops.return_insert_columns(
+            returning_fields
+        )
+        rows = compiler.execute_sql(
+            MULTI,
+            sql_params=(f"{sql} {returning_sql}", (*params, *returning_params)),
+        )
+
+        @later
+        def update_returning(rows=rows):
+            cols = [field.get_col(meta.db_table) for field in returning_fields]
+            if converters := compiler.get_converters(cols):
+                rows = compiler.apply_converters(rows, converters)
+            names = [field.attname for field in returning_fields]
+            return [dict(zip(names, row)) for row in rows]
+
+        return update_returning()
+
+    def _run_statements(self, fn, atomic):
+        """
+        Run the generator function fn with gen(), in a transaction if atomic.
+        """
+        if not atomic:
+            return gen(fn)()
+        connection = connections[self.db]
+        if not is_async():
+            with connection.atomic():
+                return gen(fn)()
+
+        async def run_atomic():
+            async with connection.atomic():
+                return await gen(fn)()
+
+        return run_atomic()
+
+    def insert_objects(self, objs, batch_size=None, atomic=False):
+        """
+        Insert objs table by table: for a multi-table inherited model the
+        rows of the parents are inserted first, with multi-row INSERT ...
+        RETURNING statements, and their pks are propagated to the parent
+        links of the children. Return objs.
+        """
+        if batch_size is not None and batch_size <= 0:
+            raise ValueError("Batch size must be a positive integer.")
+        objs = list(objs)
+        if not objs:
+            return later.value(objs)
+
+        def insert_objects():
+            yield from self._insert_table(self.model._meta.concrete_model, objs, batch_size)
+            for obj in objs:
+                obj._state.adding = False
+                obj._state.db = self.db
+            return objs
+
+        return self._run_statements(insert_objects, atomic)
+
+    def _insert_table(self, model, objs, batch_size):
+        meta = model._meta
+        for parent, field in meta.parents.items():
+            # Make sure the link fields are synced between parent and self.
+            parent_pk = parent._meta.pk
+            for obj in objs:
+                if (
+                    field
+                    and getattr(obj, parent_pk.attname) is None
+                    and getattr(obj, field.attname) is not None
+                ):
+                    setattr(obj, parent_pk.attname, getattr(obj, field.attname))
+            yield from self._insert_table(parent, objs, batch_size)
+            if field:
+                for obj in objs:
+                    setattr(obj, field.attname, getattr(obj, parent_pk.attname))
+
+        pk = meta.pk
+        for obj in objs:
+            if getattr(obj, pk.attname) is None:
+                setattr(obj, pk.attname, pk.get_pk_value_on_save(obj))
+        objs_with_pk, objs_without_pk = partition(
+            lambda o: getattr(o, pk.attname) is None, objs
+        )
+        connection = connections[self.db]
+        bulk_return = connection.features.can_return_rows_from_bulk_insert
+        for group, fields, returning_fields in [
+            (
+                objs_with_pk,
+                meta.local_concrete_fields,
+                [f for f in meta.db_returning_fields if f is not pk],
+            ),
+            (
+                objs_without_pk,
+                [f for f in meta.local_concrete_fields if f is not meta.auto_field],
+                meta.db_returning_fields,
+            ),
+        ]:
+            if not group:
+                continue
+            if returning_fields and not bulk_return:
+                size = 1
+            else:
+                size = max(connection.ops.bulk_batch_size(fields, group), 1)
+                size = min(batch_size, size) if batch_size else size
+            for i in range(0, len(group), size):
+                batch = group[i : i + size]
+                query = sql.InsertQuery(model)
+                query.insert_values(fields, batch)
+                rows = yield query.get_compiler(using=self.db).execute_sql(
+                    returning_fields or None
+                )
+                for obj, row in zip(batch, rows or ()):
+                    for value, field in zip(row, returning_fields):
+                        setattr(obj, field.attname, value)
+
+    def upsert(self, objs, conflict_fields=None, update_fields=None, batch_size=None):
+        """
+        Insert objs with INSERT ... ON CONFLICT DO UPDATE (ON DUPLICATE KEY
+        UPDATE on MySQL): the rows conflicting on conflict_fields get their
+        update_fields updated instead. Return the pks of the rows, which are
+        also set on objs, where the database can return them (the pks set
+        beforehand otherwise).
+        """
+        meta = self.model._meta
+        for parent in meta.get_parent_list():
+            if parent._meta.concrete_model is not meta.concrete_model:
+                raise ValueError("Can't upsert a multi-table inherited model")
+        if batch_size is not None and batch_size <= 0:
+            raise ValueError("Batch size must be a positive integer.")
+        if conflict_fields:
+            conflict_fields = [
+                meta.get_field(meta.pk.name if name == "pk" else name)
+                for name in conflict_fields
+            ]
+        if update_fields:
+            update_fields = [meta.get_field(name) for name in update_fields]
+        on_conflict = self._check_bulk_create_options(
+            False, True, update_fields, conflict_fields
+        )
+        objs = list(objs)
+        if not objs:
+            return later.value([])
+        for obj in objs:
+            if obj.pk is None:
+                obj.pk = meta.pk.get_pk_value_on_save(obj)
+        connection = connections[self.db]
+        returning_fields = None
+        if connection.features.can_return_rows_from_bulk_insert:
+            returning_fields = [meta.pk]
+        objs_with_pk, objs_without_pk = partition(lambda o: o.pk is None, objs)
+        batches = []
+        for group, fields in [
+            (objs_with_pk, meta.concrete_fields),
+            (objs_without_pk, [f for f in meta.concrete_fields if f is not meta.auto_field]),
+        ]:
+            if not group:
+                continue
+            max_batch_size = max(connection.ops.bulk_batch_size(fields, group), 1)
+            size = min(batch_size, max_batch_size) if batch_size else max_batch_size
+            batches.extend((group[i : i + size], fields) for i in range(0, len(group), size))
+
+        def upsert():
+            for batch, fields in batches:
+                rows = yield self._insert(
+                    batch,
+                    fields=fields,
+                    returning_fields=returning_fields,
+                    using=self.db,
+                    on_conflict=on_conflict,
+                    update_fields=update_fields,
+                    unique_fields=conflict_fields,
+                )
+                for obj, (pk,) in zip(batch, rows or ()):
+                    setattr(obj, meta.pk.attname, pk)
+                for obj in batch:
+                    obj._state.adding = False
+                    obj._state.db = self.db
+            return [obj.pk for obj in objs]
+
+        # A single statement is atomic already.
+        return self._run_statements(upsert, len(batches) > 1)
+
+    if django.VERSION < (4, 2):
+        def _check_bulk_create_options(
+            self, ignore_conflicts, update_conflicts, update_fields, unique_fields
+        ):
+            # Django 4.1 takes the names of the fields.
+            return super()._check_bulk_create_options(
+                ignore_conflicts,
+                update_conflicts,
+                update_fields and [f.name for f in update_fields],
+                unique_fields and [f.name for f in unique_fields],
+            )
+
+    def load_deferred(self, objs, *fields):
+        """
+        Load the deferred fields of objs - all of them or the given ones -
+        with a single pk__in query selecting only the missing columns.
+        """
+        meta = self.model._meta
+        if fields:
+            attnames = [meta.get_field(name).attname for name in fields]
+        else:
+            attnames = [f.attname for f in meta.concrete_fields]
+        attnames = [name for name in attnames if name != meta.pk.attname]
+        to_load = [
+            (obj, missing)
+            for obj in objs
+            if (missing := {name for name in attnames if name not in obj.__dict__})
+        ]
+        if not to_load:
+            return later.value(None)
+        names = [
+            name for name in attnames if any(name in missing for _, missing in to_load)
+        ]
+        rows = self.filter(
+            pk__in={obj.pk for obj, _ in to_load}
+        ).values_list(meta.pk.attname, *names)._fetch_all_()
+
+        @later
+        def load_deferred(rows=rows):
+            values = {row[0]: row[1:] for row in rows}
+            # Check first, so that no object is left half-loaded.
+            if any(obj.pk not in values for obj, _ in to_load):
+                raise meta.model.DoesNotExist(
+                    "%s matching query does not exist." % meta.object_name
+                )
+            for obj, missing in to_load:
+                for name, value in zip(names, values[obj.pk]):
+                    if name in missing:
+                        setattr(obj, name, value)
+
+        return load_deferred()
+
     def get(self, *args, **kwargs):
         """
         Perform the query and return a single object matching the given
@@ -158,6 +566,221 @@ class VinylQuerySet(QuerySet):
 
         return last()
 
+    def parallel_iter(self, partitions=4, concurrency=None, batch_size=GET_ITERATOR_CHUNK_SIZE):
+        """
+        Split the queryset into `partitions` primary key ranges and fetch
+        them concurrently, each on a connection of its own: pooled
+        connections in async mode, a thread pool in sync mode.
+
+        Every range is read in lists of at most batch_size objects, see
+        chunks(). Yield the lists as soon as they arrive, so their order is
+        not defined. At most `concurrency` lists wait to be consumed.
+        """
+        if self.query.is_sliced:
+            raise TypeError("Cannot partition a query once a slice has been taken.")
+        if partitions < 1:
+            raise ValueError("partitions must be a positive integer.")
+        concurrency = concurrency or partitions
+        if not is_async():
+            return self._parallel_iter(partitions, concurrency, batch_size)
+        return self._aparallel_iter(partitions, concurrency, batch_size)
+
+    def _partition(self, pk_range, partitions):
+        low, high = pk_range
+        if low is None:
+            return []
+        if not isinstance(low, int):
+            raise TypeError(
+                "parallel_iter() requires an integer primary key, got %r."
+                % type(low).__name__
+            )
+        step = -(-(high - low + 1) // partitions)
+        return [
+            self.filter(pk__gte=start, pk__lt=start + step)
+            for start in range(low, high + 1, step)
+        ]
+
+    def _parallel_iter(self, partitions, concurrency, batch_size):
+        querysets = self._partition(self.query.get_pk_range(self.db), partitions)
+        if not querysets:
+            return
+        batches = queue.Queue(maxsize=concurrency)
+        stop = threading.Event()
+        done = object()
+
+        def put(item):
+            while not stop.is_set():
+                try:
+                    batches.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    pass
+            return False
+
+        def fetch(qs):
+            if stop.is_set():
+                return
+            set_async(False)
+            chunks = qs.chunks(batch_size)
+            try:
+                for batch in chunks:
+                    if not put(batch):
+                        return
+            except Exception as ex:
+                put(ex)
+                return
+            finally:
+                chunks.close()
+                connections[qs.db].close()
+            put(done)
+
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            for qs in querysets:
+                executor.submit(fetch, qs)
+            try:
+                remaining = len(querysets)
+                while remaining:
+                    item = batches.get()
+                    if item is done:
+                        remaining -= 1
+                    elif isinstance(item, Exception):
+                        raise item
+                    else:
+                        yield item
+            finally:
+                stop.set()
+
+    async def _aparallel_iter(self, partitions, concurrency, batch_size):
+        pk_range = await self.query.get_pk_range(self.db)
+        querysets = self._partition(pk_range, partitions)
+        if not querysets:
+            return
+        connection = connections[self.db]
+        semaphore = asyncio.Semaphore(concurrency)
+        batches = asyncio.Queue(maxsize=concurrency)
+        done = object()
+
+        async def fetch(qs):
+            # Don't reuse the connection bound to the caller's context.
+            connection.async_connection.set(None)
+            try:
+                async with semaphore:
+                    chunks = qs.chunks(batch_size)
+                    try:
+                        async for batch in chunks:
+                            await batches.put(batch)
+                    finally:
+                        await chunks.aclose()
+            except Exception as ex:
+                await batches.put(ex)
+                return
+            await batches.put(done)
+
+        tasks = [asyncio.ensure_future(fetch(qs)) for qs in querysets]
+        try:
+            remaining = len(tasks)
+            while remaining:
+                item = await batches.get()
+                if item is done:
+                    remaining -= 1
+                elif isinstance(item, Exception):
+                    raise item
+                else:
+                    yield item
+        finally:
+            for task in tasks:
+                task.cancel()
+            # Wait for the scans to stop before their connections go back to
+            # the pool, and retrieve their exceptions.
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    def as_arrays(self, chunk_size=GET_ITERATOR_CHUNK_SIZE):
+        """
+        Return a dict of column name -> Column for a values()/values_list()
+        queryset. Numeric and boolean columns are stored in typed arrays
+        (numpy if installed, array.array otherwise), the rest in lists.
+        """
+        if self._fields is None and self._iterable_class is ModelIterable:
+            raise TypeError(
+                "as_arrays() is only supported on values() and values_list() querysets."
+            )
+        if self._prefetch_related_lookups:
+            raise ValueError("as_arrays() is not compatible with prefetch_related().")
+        return columnar.ColumnarIterable(self, chunk_size=chunk_size).get_objects()
+
+    def to_numpy(self, chunk_size=GET_ITERATOR_CHUNK_SIZE):
+        """
+        Same as as_arrays(), but return numpy arrays, masked ones for the
+        columns containing nulls.
+        """
+        if columnar.numpy is None:
+            raise ImportError("to_numpy() requires numpy to be installed.")
+
+        @later
+        def to_numpy(columns=self.as_arrays(chunk_size=chunk_size)):
+            return {name: column.to_numpy() for name, column in columns.items()}
+
+        return to_numpy()
+
+    def to_arrow(self, batch_size=GET_ITERATOR_CHUNK_SIZE):
+        """
+        Return a pyarrow.RecordBatchReader streaming the results as record
+        batches of batch_size rows, with a schema derived from the fields.
+        In async mode the batches are fetched before the reader is returned.
+        """
+        self._check_arrow("to_arrow")
+        return arrow.ArrowIterable(self, chunk_size=batch_size).get_objects()
+
+    def to_parquet(self, path, batch_size=GET_ITERATOR_CHUNK_SIZE, **kwargs):
+        """
+        Write the results to a parquet file batch by batch. Extra kwargs are
+        passed to pyarrow.parquet.ParquetWriter. Return the number of rows.
+        """
+        self._check_arrow("to_parquet")
+        import pyarrow.parquet
+
+        schema, batches = arrow.ArrowIterable(self, chunk_size=batch_size).iter_batches()
+
+        def to_parquet():
+            num_rows = 0
+            try:
+                with pyarrow.parquet.ParquetWriter(path, schema, **kwargs) as writer:
+                    for batch in batches:
+                        writer.write_batch(batch)
+                        num_rows += batch.num_rows
+            finally:
+                batches.close()
+            return num_rows
+
+        async def ato_parquet():
+            num_rows = 0
+            try:
+                with pyarrow.parquet.ParquetWriter(path, schema, **kwargs) as writer:
+                    async for batch in batches:
+                        writer.write_batch(batch)
+                        num_rows += batch.num_rows
+            finally:
+                await batches.aclose()
+            return num_rows
+
+        return ato_parquet() if is_async() else to_parquet()
+
+    def _check_arrow(self, method):
+        if arrow.pyarrow is None:
+            raise ImportError("%s() requires pyarrow to be installed." % method)
+        if self._prefetch_related_lookups:
+            raise ValueError("%s() is not compatible with prefetch_related()." % method)
+
+    def timeout(self, seconds):
+        """
+        Give the statements of the queryset seconds to complete: the server-
+        side statement timeout is set where the backend has one and in async
+        mode the statement is cancelled when the time is up.
+        """
+        clone = self._chain()
+        clone.query.timeout = seconds
+        return clone
+
     def prefetch(self, *lookups):
         return self.prefetch_related(*lookups)
 
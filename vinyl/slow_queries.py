@@ -0,0 +1,130 @@
+"""
+Sampling of the plans of the slow queries.
+
+With settings.VINYL_SLOW_QUERY_THRESHOLD (seconds) set, the plan of the
+SELECT statements running longer is captured with EXPLAIN ANALYZE (with
+BUFFERS where the backend supports it) on a separate connection, for a
+share settings.VINYL_SLOW_QUERY_SAMPLE_RATE of them (all by default) and
+one at a time. The plans are reported with the slow_query signal. The
+locking statements (SELECT ... FOR UPDATE...) are never sampled.
+"""
+import asyncio
+import logging
+import random
+import re
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connections
+from django.dispatch import Signal
+
+from vinyl.futures import is_async, set_async
+
+logger = logging.getLogger("vinyl")
+
+# Sent with using, sql, params, duration and plan.
+slow_query = Signal()
+
+# The sampling in progress: asyncio tasks or futures of the executor.
+running = set()
+executor = None
+
+EXPLAIN_OPTIONS = [{"analyze": True, "buffers": True}, {"analyze": True}, {}]
+
+# The locking clauses: rerun on another connection, the statement would wait
+# for the locks of the caller's transaction, and take new ones.
+LOCKING_RE = re.compile(
+    r"\bFOR\s+(?:NO\s+KEY\s+UPDATE|KEY\s+SHARE|UPDATE|SHARE)\b|\bLOCK\s+IN\s+SHARE\s+MODE\b",
+    re.IGNORECASE,
+)
+
+
+def should_sample(sql, duration):
+    threshold = getattr(settings, "VINYL_SLOW_QUERY_THRESHOLD", None)
+    if threshold is None or duration < threshold or running:
+        return False
+    if sql.lstrip()[:6].upper() != "SELECT":
+        # EXPLAIN ANALYZE runs the statement again
+        return False
+    if LOCKING_RE.search(sql):
+        return False
+    rate = getattr(settings, "VINYL_SLOW_QUERY_SAMPLE_RATE", 1)
+    return rate >= 1 or random.random() < rate
+
+
+def get_explain_prefix(connection):
+    for options in EXPLAIN_OPTIONS:
+        try:
+            return connection.ops.explain_query_prefix(**options)
+        except ValueError:
+            continue
+
+
+def format_plan(rows):
+    # As SQLCompiler.explain_query() does.
+    return "\n".join(
+        row if isinstance(row, str) else " ".join(map(str, row)) for row in rows
+    )
+
+
+def sample(connection, sql, params, duration):
+    """
+    Capture the plan of a slow query in the background: in a task in async
+    mode, in a thread with its own connection in sync mode.
+    """
+    if is_async():
+        task = asyncio.get_running_loop().create_task(
+            aexplain(connection, sql, params, duration)
+        )
+        running.add(task)
+        task.add_done_callback(running.discard)
+        return
+    global executor
+    if executor is None:
+        executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="vinyl-explain")
+    future = executor.submit(explain, connection.alias, sql, params, duration)
+    running.add(future)
+    future.add_done_callback(running.discard)
+
+
+async def aexplain(connection, sql, params, duration):
+    try:
+        if connection.async_pool is None:
+            await connection.start_pool()
+        # Not connection.cursor(): the connection of the context is busy.
+        async with connection.get_connection_from_pool() as conn:
+            async with conn.cursor() as cursor:
+                if connection.CursorWrapper:
+                    cursor = connection.CursorWrapper(cursor)
+                await cursor.execute(f"{get_explain_prefix(connection)} {sql}", params)
+                rows = await cursor.fetchall()
+    except Exception:
+        logger.exception("Couldn't capture the plan of a slow query.")
+        return
+    report(connection.alias, sql, params, duration, rows)
+
+
+def explain(using, sql, params, duration):
+    set_async(False)
+    connection = connections[using]
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(f"{get_explain_prefix(connection)} {sql}", params)
+            rows = cursor.fetchall()
+    except Exception:
+        logger.exception("Couldn't capture the plan of a slow query.")
+        return
+    finally:
+        connection.close()
+    report(using, sql, params, duration, rows)
+
+
+def report(using, sql, params, duration, rows):
+    slow_query.send(
+        sender=None,
+        using=using,
+        sql=sql,
+        params=params,
+        duration=duration,
+        plan=format_plan(rows),
+    )
@@ -1,8 +1,12 @@
 from functools import partial
 
+from django.core.exceptions import ImproperlyConfigured
 from django.urls import path, URLPattern
 from django.urls.conf import _path
 from django.urls.resolvers import RoutePattern
+from django.views import View
+
+from vinyl.web.resolver import MethodsURLPattern
 
 
 def get(*args, **kwargs):
@@ -19,6 +23,49 @@ def post(*args, **kwargs):
     p.method = 'post'
     return p
 
+def put(*args, **kwargs):
+    kwargs['Pattern'] = RoutePattern
+    p = _path(*args, **kwargs)
+    assert isinstance(p, URLPattern)
+    p.method = 'put'
+    return p
+
+def patch(*args, **kwargs):
+    kwargs['Pattern'] = RoutePattern
+    p = _path(*args, **kwargs)
+    assert isinstance(p, URLPattern)
+    p.method = 'patch'
+    return p
+
+def delete(*args, **kwargs):
+    kwargs['Pattern'] = RoutePattern
+    p = _path(*args, **kwargs)
+    assert isinstance(p, URLPattern)
+    p.method = 'delete'
+    return p
+
+def route(route, kwargs=None, name=None, **views):
+    """
+    Declare the views of several methods on one path:
+
+        route('items/<int:pk>/', get=show_item, delete=delete_item, name='item')
+    """
+    assert views
+    if kwargs is not None and not isinstance(kwargs, dict):
+        raise TypeError(
+            f"kwargs argument must be a dict, but got {kwargs.__class__.__name__}."
+        )
+    views = {method.lower(): view for method, view in views.items()}
+    if unknown := [method for method in views if method not in View.http_method_names]:
+        raise ImproperlyConfigured(
+            "Unknown HTTP method(s) %s in route %r." % (", ".join(unknown), route)
+        )
+    for view in views.values():
+        if not callable(view):
+            raise TypeError("view must be a callable.")
+    pattern = RoutePattern(route, name=name, is_endpoint=True)
+    return MethodsURLPattern(pattern, views, kwargs, name)
+
 #
 # class MyRoutePattern(RoutePattern):
 #     def match(self, path):
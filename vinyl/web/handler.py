@@ -1,8 +1,29 @@
+import asyncio
+import inspect
+import logging
+
+from django.conf import settings
+from django.core import signals
+from django.core.exceptions import (
+    ImproperlyConfigured,
+    MiddlewareNotUsed,
+    RequestAborted,
+)
+from django.core.handlers.asgi import ASGIHandler
+from django.core.handlers.exception import convert_exception_to_response
 from django.core.handlers.wsgi import WSGIHandler
+from django.http import FileResponse
+from django.urls import set_script_prefix, set_urlconf
+from django.utils.deprecation import MiddlewareMixin
+from django.utils.log import log_response
+from django.utils.module_loading import import_string
+
+from vinyl.web.resolver import get_resolver
 
+logger = logging.getLogger("django.request")
 
-class VinylWSGIHandler(WSGIHandler):
 
+class VinylHandlerMixin:
 
     def resolve_request(self, request):
         """
@@ -17,6 +38,347 @@ class VinylWSGIHandler(WSGIHandler):
         else:
             resolver = get_resolver()
         # Resolve the view, and assign the match object back to the request.
-        resolver_match = resolver.resolve(request.path_info, request.method)
+        resolver_match = resolver.resolve(request.path_info, request.method.lower())
         request.resolver_match = resolver_match
-        return resolver_match
\ No newline at end of file
+        return resolver_match
+
+
+class VinylWSGIHandler(VinylHandlerMixin, WSGIHandler):
+    pass
+
+
+def is_inline_mixin(mw_instance):
+    """
+    Whether mw_instance is a MiddlewareMixin running its hooks with
+    sync_to_async() in async mode.
+    """
+    return (
+        isinstance(mw_instance, MiddlewareMixin)
+        and type(mw_instance).__acall__ is MiddlewareMixin.__acall__
+    )
+
+
+def make_inline_acall(mw_instance):
+    """
+    MiddlewareMixin.__acall__() calling the hooks inline, awaiting the
+    coroutine ones.
+    """
+    async def acall(request):
+        response = None
+        if hasattr(mw_instance, "process_request"):
+            response = mw_instance.process_request(request)
+            if inspect.isawaitable(response):
+                response = await response
+        response = response or await mw_instance.get_response(request)
+        if hasattr(mw_instance, "process_response"):
+            response = mw_instance.process_response(request, response)
+            if inspect.isawaitable(response):
+                response = await response
+        return response
+
+    return acall
+
+
+class VinylASGIHandler(VinylHandlerMixin, ASGIHandler):
+    """
+    ASGI handler that runs everything on the event loop: coroutine views
+    are awaited, the middleware hooks and sync views are called inline,
+    nothing is handed over to a thread.
+
+    The middlewares based on django's MiddlewareMixin get their hooks called
+    inline too, instead of with sync_to_async() as its __acall__() does.
+
+    The view is cancelled when the client disconnects before the response
+    is sent.
+    """
+
+    def load_middleware(self, is_async=False):
+        """
+        BaseHandler.load_middleware(), running the hooks of the
+        MiddlewareMixin instances inline in async mode.
+        """
+        self._view_middleware = []
+        self._template_response_middleware = []
+        self._exception_middleware = []
+
+        get_response = self._get_response_async if is_async else self._get_response
+        handler = convert_exception_to_response(get_response)
+        handler_is_async = is_async
+        for middleware_path in reversed(settings.MIDDLEWARE):
+            middleware = import_string(middleware_path)
+            middleware_can_sync = getattr(middleware, "sync_capable", True)
+            middleware_can_async = getattr(middleware, "async_capable", False)
+            if not middleware_can_sync and not middleware_can_async:
+                raise RuntimeError(
+                    "Middleware %s must have at least one of "
+                    "sync_capable/async_capable set to True." % middleware_path
+                )
+            elif not handler_is_async and middleware_can_sync:
+                middleware_is_async = False
+            else:
+                middleware_is_async = middleware_can_async
+            try:
+                # Adapt handler, if needed.
+                adapted_handler = self.adapt_method_mode(
+                    middleware_is_async,
+                    handler,
+                    handler_is_async,
+                    debug=settings.DEBUG,
+                    name="middleware %s" % middleware_path,
+                )
+                mw_instance = middleware(adapted_handler)
+            except MiddlewareNotUsed as exc:
+                if settings.DEBUG:
+                    if str(exc):
+                        logger.debug("MiddlewareNotUsed(%r): %s", middleware_path, exc)
+                    else:
+                        logger.debug("MiddlewareNotUsed: %r", middleware_path)
+                continue
+            else:
+                handler = adapted_handler
+
+            if mw_instance is None:
+                raise ImproperlyConfigured(
+                    "Middleware factory %s returned None." % middleware_path
+                )
+            if middleware_is_async and is_inline_mixin(mw_instance):
+                # MiddlewareMixin.__call__() switches to self.__acall__()
+                mw_instance.__acall__ = make_inline_acall(mw_instance)
+
+            if hasattr(mw_instance, "process_view"):
+                self._view_middleware.insert(
+                    0,
+                    self.adapt_method_mode(is_async, mw_instance.process_view),
+                )
+            if hasattr(mw_instance, "process_template_response"):
+                self._template_response_middleware.append(
+                    self.adapt_method_mode(
+                        is_async, mw_instance.process_template_response
+                    ),
+                )
+            if hasattr(mw_instance, "process_exception"):
+                self._exception_middleware.append(
+                    self.adapt_method_mode(False, mw_instance.process_exception),
+                )
+
+            handler = convert_exception_to_response(mw_instance)
+            handler_is_async = middleware_is_async
+
+        # Adapt the top of the stack, if needed.
+        handler = self.adapt_method_mode(is_async, handler, handler_is_async)
+        self._middleware_chain = handler
+
+    def adapt_method_mode(
+        self,
+        is_async,
+        method,
+        method_is_async=None,
+        debug=False,
+        name=None,
+    ):
+        if method_is_async is None:
+            method_is_async = inspect.iscoroutinefunction(method)
+        if is_async == method_is_async:
+            return method
+        if not is_async:
+            if getattr(method, "__name__", None) == "process_exception":
+                # django adapts the process_exception() hooks to sync mode,
+                # aprocess_exception_by_middleware() awaits the async ones.
+                return method
+            raise ImproperlyConfigured(
+                "%s is synchronous-only, VinylASGIHandler requires async-capable "
+                "middleware." % (name or method.__qualname__)
+            )
+
+        async def inline(*args, **kwargs):
+            return method(*args, **kwargs)
+
+        return inline
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            raise ValueError(
+                "Vinyl can only handle ASGI/HTTP connections, not %s." % scope["type"]
+            )
+        await self.handle(scope, receive, send)
+
+    async def handle(self, scope, receive, send):
+        try:
+            body_file = await self.read_body(receive)
+        except RequestAborted:
+            return
+        try:
+            set_script_prefix(self.get_script_prefix(scope))
+            signals.request_started.send(sender=self.__class__, scope=scope)
+            request, error_response = self.create_request(scope, body_file)
+            if request is None:
+                await self.send_response(error_response, send)
+                return
+            # Cancel the view if the client disconnects, like django 5.0.
+            tasks = [
+                # First: it's not expected to raise errors that would prevent
+                # process_request() from being cancelled.
+                asyncio.ensure_future(self.listen_for_disconnect(receive)),
+                asyncio.ensure_future(self.process_request(request, send)),
+            ]
+            await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+            for task in tasks:
+                if task.done():
+                    try:
+                        task.result()
+                    except RequestAborted:
+                        pass
+                else:
+                    # Let the view handle the cancellation.
+                    task.cancel()
+                    try:
+                        await task
+                    except asyncio.CancelledError:
+                        pass
+            if tasks[1].cancelled():
+                signals.request_finished.send(sender=self.__class__)
+        finally:
+            body_file.close()
+
+    async def listen_for_disconnect(self, receive):
+        message = await receive()
+        if message["type"] == "http.disconnect":
+            raise RequestAborted()
+        # This should never happen.
+        assert False, "Invalid ASGI message after request body: %s" % message["type"]
+
+    async def process_request(self, request, send):
+        response = await self.get_response_async(request)
+        response._handler_class = self.__class__
+        if isinstance(response, FileResponse):
+            response.block_size = self.chunk_size
+        try:
+            await self.send_response(response, send)
+        except asyncio.CancelledError:
+            # The client disconnected during send_response(), which closed
+            # the response.
+            pass
+
+    async def get_response_async(self, request):
+        set_urlconf(settings.ROOT_URLCONF)
+        response = await self._middleware_chain(request)
+        response._resource_closers.append(request.close)
+        if response.status_code >= 400:
+            log_response(
+                "%s: %s",
+                response.reason_phrase,
+                request.path,
+                response=response,
+                request=request,
+            )
+        return response
+
+    async def _get_response_async(self, request):
+        response = None
+        callback, callback_args, callback_kwargs = self.resolve_request(request)
+
+        for middleware_method in self._view_middleware:
+            response = await middleware_method(
+                request, callback, callback_args, callback_kwargs
+            )
+            if response:
+                break
+
+        if response is None:
+            try:
+                response = callback(request, *callback_args, **callback_kwargs)
+                if inspect.isawaitable(response):
+                    response = await response
+            except Exception as e:
+                response = await self.aprocess_exception_by_middleware(e, request)
+                if response is None:
+                    raise
+
+        self.check_response(response, callback)
+
+        # If the response supports deferred rendering, apply template
+        # response middleware and then render the response
+        if hasattr(response, "render") and callable(response.render):
+            for middleware_method in self._template_response_middleware:
+                response = await middleware_method(request, response)
+                self.check_response(
+                    response,
+                    middleware_method,
+                    name="%s.process_template_response"
+                    % (middleware_method.__self__.__class__.__name__,),
+                )
+            try:
+                response = response.render()
+                if inspect.isawaitable(response):
+                    response = await response
+            except Exception as e:
+                response = await self.aprocess_exception_by_middleware(e, request)
+                if response is None:
+                    raise
+
+        if inspect.iscoroutine(response):
+            raise RuntimeError("Response is still a coroutine.")
+        return response
+
+    async def aprocess_exception_by_middleware(self, exception, request):
+        """
+        process_exception_by_middleware(), awaiting the coroutine hooks.
+        """
+        for middleware_method in self._exception_middleware:
+            response = middleware_method(request, exception)
+            if inspect.isawaitable(response):
+                response = await response
+            if response:
+                return response
+        return None
+
+    async def send_response(self, response, send):
+        response_headers = []
+        for header, value in response.items():
+            if isinstance(header, str):
+                header = header.encode("ascii")
+            if isinstance(value, str):
+                value = value.encode("latin1")
+            response_headers.append((bytes(header), bytes(value)))
+        for c in response.cookies.values():
+            response_headers.append(
+                (b"Set-Cookie", c.output(header="").encode("ascii").strip())
+            )
+        try:
+            await send(
+                {
+                    "type": "http.response.start",
+                    "status": response.status_code,
+                    "headers": response_headers,
+                }
+            )
+            if response.streaming:
+                if getattr(response, "is_async", False):
+                    async for part in response:
+                        await self.send_part(part, send)
+                else:
+                    for part in response:
+                        await self.send_part(part, send)
+                await send({"type": "http.response.body"})
+            else:
+                for chunk, last in self.chunk_bytes(response.content):
+                    await send(
+                        {
+                            "type": "http.response.body",
+                            "body": chunk,
+                            "more_body": not last,
+                        }
+                    )
+        finally:
+            # Also when cancelled by a disconnect.
+            response.close()
+
+    async def send_part(self, part, send):
+        for chunk, _ in self.chunk_bytes(part):
+            await send(
+                {
+                    "type": "http.response.body",
+                    "body": chunk,
+                    "more_body": True,
+                }
+            )
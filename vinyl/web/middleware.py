@@ -0,0 +1,56 @@
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+
+from vinyl.nplusone import detect_n_plus_one
+from vinyl.prefetch import use_prefetch_cache
+
+
+class ContextMiddleware:
+    """
+    Base of the middlewares running the rest of the chain in the context
+    manager returned by wrap(request), in sync and async mode.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            # Mark the instance as a coroutine function.
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        with self.wrap(request):
+            return self.get_response(request)
+
+    async def __acall__(self, request):
+        with self.wrap(request):
+            return await self.get_response(request)
+
+    def wrap(self, request):
+        raise NotImplementedError
+
+
+class PrefetchCacheMiddleware(ContextMiddleware):
+    """
+    Share the prefetched objects between the querysets of a request, see
+    vinyl.prefetch.use_prefetch_cache().
+    """
+
+    def wrap(self, request):
+        return use_prefetch_cache()
+
+
+class NPlusOneMiddleware(ContextMiddleware):
+    """
+    Report the N+1 queries of the requests, see vinyl.nplusone. Meant for
+    development and staging.
+    """
+
+    def wrap(self, request):
+        return detect_n_plus_one(self.get_label(request))
+
+    def get_label(self, request):
+        return f"{request.method} {request.path}"
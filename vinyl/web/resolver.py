@@ -1,14 +1,103 @@
-from functools import cached_property
+import functools
+from collections import OrderedDict
+from functools import cached_property, partial
 
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.http import HttpResponse, HttpResponseNotAllowed
+from django.urls import clear_url_caches as _clear_url_caches
 from django.urls import URLResolver, URLPattern, ResolverMatch, Resolver404
+from django.urls.resolvers import RegexPattern
+
+from vinyl.web.routing import RouteTable
+
+
+class ResolveCache:
+    """
+    A bounded LRU mapping (method, path) to the arguments of ResolverMatch.
+    """
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.data = OrderedDict()
+
+    def get(self, key):
+        try:
+            value = self.data[key]
+            self.data.move_to_end(key)
+        except KeyError:
+            return None
+        return value
+
+    def set(self, key, value):
+        data = self.data
+        data[key] = value
+        if len(data) > self.maxsize:
+            try:
+                data.popitem(last=False)
+            except KeyError:
+                pass
+
+    def clear(self):
+        self.data.clear()
 
 
 class MyURLPattern(URLPattern):
-    def resolve(self, path, method):
-        if self.method == method:
+    method = None  # any method
+
+    def resolve(self, path, method=None):
+        if (
+            self.method is None
+            or method is None
+            or self.method == method
+            or (method == "head" and self.method == "get")
+        ):
             return super().resolve(path)
 
 
+class MethodsURLPattern(MyURLPattern):
+    """
+    A url pattern with a view per method, see vinyl.web.declare.route().
+    """
+
+    def __init__(self, pattern, views, default_args=None, name=None):
+        super().__init__(pattern, next(iter(views.values())), default_args, name)
+        self.views = views
+
+    def resolve(self, path, method=None):
+        if method is None:
+            view = self.callback
+        elif not (view := self.views.get(method)):
+            if method != "head" or not (view := self.views.get("get")):
+                return None
+        match = self.pattern.match(path)
+        if match:
+            new_path, args, captured_kwargs = match
+            # Pass any default args as **kwargs.
+            kwargs = {**captured_kwargs, **self.default_args}
+            return ResolverMatch(
+                view,
+                args,
+                kwargs,
+                self.pattern.name,
+                route=str(self.pattern),
+                captured_kwargs=captured_kwargs,
+                extra_kwargs=self.default_args,
+            )
+
+
+def method_not_allowed(request, *args, permitted_methods, **kwargs):
+    return HttpResponseNotAllowed(permitted_methods)
+
+
+def allowed_methods(request, *args, permitted_methods, **kwargs):
+    response = HttpResponse()
+    response["Allow"] = ", ".join(permitted_methods)
+    response["Content-Length"] = "0"
+    return response
+
+
 class MyURLResolver(URLResolver):
 
     @cached_property
@@ -21,8 +110,144 @@ class MyURLResolver(URLResolver):
                 p.__class__ = MyURLPattern
         return patterns
 
-    def resolve(self, path, method):
+    @cached_property
+    def route_table(self):
+        return RouteTable(self)
+
+    @cached_property
+    def resolve_cache(self):
+        return ResolveCache(self.resolve_cache_size)
+
+    resolve_cache_size = 1024  # 0 disables the cache
+
+    def resolve(self, path, method=None):
         path = str(path)  # path may be a reverse_lazy object
+        if not self.resolve_cache_size:
+            return self._resolve_compiled(path, method)
+        key = (method, path)
+        if (cached := self.resolve_cache.get(key)) is not None:
+            func, args, kwargs, url_name, app_names, namespaces, route, captured_kwargs, extra_kwargs = cached
+            return ResolverMatch(
+                func,
+                args,
+                dict(kwargs),
+                url_name,
+                app_names,
+                namespaces,
+                route,
+                None,
+                captured_kwargs=dict(captured_kwargs),
+                extra_kwargs=dict(extra_kwargs),
+            )
+        match = self._resolve_compiled(path, method)
+        if match.tried is None:
+            self.resolve_cache.set(key, (
+                match.func,
+                match.args,
+                dict(match.kwargs),
+                match.url_name,
+                match.app_names,
+                match.namespaces,
+                match.route,
+                dict(match.captured_kwargs or {}),
+                dict(match.extra_kwargs or {}),
+            ))
+        return match
+
+    def _resolve_compiled(self, path, method):
+        match = self.pattern.match(path)
+        if not match:
+            raise Resolver404({"path": path})
+        new_path, args, kwargs = match
+        route_table = self.route_table
+        found, allowed = route_table.lookup(new_path, method)
+        for order, pattern in route_table.fallback:
+            if found and found[0].order < order:
+                break
+            try:
+                sub_match = pattern.resolve(new_path, method)
+            except Resolver404:
+                continue
+            if sub_match:
+                return self._make_match(pattern, sub_match, args, kwargs, None)
+        if found:
+            endpoint, captured = found
+            return self._make_endpoint_match(endpoint, captured, args, kwargs)
+        if allowed:
+            return self._make_methods_match(method, allowed)
+        if settings.DEBUG:
+            # Only the technical 404 page needs the list of tried patterns.
+            return self._resolve(path, method)
+        raise Resolver404({"path": new_path})
+
+    def _make_endpoint_match(self, endpoint, captured, args, kwargs):
+        sub_kwargs, captured_kwargs = endpoint.get_kwargs(captured)
+        sub_match_dict = {**kwargs, **self.default_kwargs, **sub_kwargs}
+        return ResolverMatch(
+            endpoint.func,
+            () if sub_match_dict else args,
+            sub_match_dict,
+            endpoint.url_name,
+            endpoint.app_names,
+            endpoint.namespaces,
+            endpoint.route,
+            None,
+            captured_kwargs=captured_kwargs,
+            extra_kwargs={**self.default_kwargs, **endpoint.extra_kwargs},
+        )
+
+    def _make_methods_match(self, method, allowed):
+        """
+        The path matched, the method didn't: answer OPTIONS with the allowed
+        methods, the other methods with 405.
+        """
+        permitted = {m.upper() for m in allowed}
+        permitted.add("OPTIONS")
+        if "GET" in permitted:
+            permitted.add("HEAD")
+        view = allowed_methods if method == "options" else method_not_allowed
+        return ResolverMatch(
+            partial(view, permitted_methods=sorted(permitted)), (), {}, tried=None
+        )
+
+    def _make_match(self, pattern, sub_match, args, kwargs, tried):
+        # Merge captured arguments in match with submatch
+        sub_match_dict = {**kwargs, **self.default_kwargs}
+        # Update the sub_match_dict with the kwargs from the sub_match.
+        sub_match_dict.update(sub_match.kwargs)
+        # If there are *any* named groups, ignore all non-named groups.
+        # Otherwise, pass all non-named arguments as positional
+        # arguments.
+        sub_match_args = sub_match.args
+        if not sub_match_dict:
+            sub_match_args = args + sub_match.args
+        current_route = (
+            ""
+            if isinstance(pattern, URLPattern)
+            else str(pattern.pattern)
+        )
+        if tried is not None:
+            self._extend_tried(tried, pattern, sub_match.tried)
+        return ResolverMatch(
+            sub_match.func,
+            sub_match_args,
+            sub_match_dict,
+            sub_match.url_name,
+            [self.app_name] + sub_match.app_names,
+            [self.namespace] + sub_match.namespaces,
+            self._join_route(current_route, sub_match.route),
+            tried,
+            captured_kwargs=sub_match.captured_kwargs,
+            extra_kwargs={
+                **self.default_kwargs,
+                **sub_match.extra_kwargs,
+            },
+        )
+
+    def _resolve(self, path, method=None):
+        """
+        Resolve by trying every pattern in order, recording the tried ones.
+        """
         tried = []
         match = self.pattern.match(path)
         if match:
@@ -34,37 +259,33 @@ class MyURLResolver(URLResolver):
                     self._extend_tried(tried, pattern, e.args[0].get("tried"))
                 else:
                     if sub_match:
-                        # Merge captured arguments in match with submatch
-                        sub_match_dict = {**kwargs, **self.default_kwargs}
-                        # Update the sub_match_dict with the kwargs from the sub_match.
-                        sub_match_dict.update(sub_match.kwargs)
-                        # If there are *any* named groups, ignore all non-named groups.
-                        # Otherwise, pass all non-named arguments as positional
-                        # arguments.
-                        sub_match_args = sub_match.args
-                        if not sub_match_dict:
-                            sub_match_args = args + sub_match.args
-                        current_route = (
-                            ""
-                            if isinstance(pattern, URLPattern)
-                            else str(pattern.pattern)
-                        )
-                        self._extend_tried(tried, pattern, sub_match.tried)
-                        return ResolverMatch(
-                            sub_match.func,
-                            sub_match_args,
-                            sub_match_dict,
-                            sub_match.url_name,
-                            [self.app_name] + sub_match.app_names,
-                            [self.namespace] + sub_match.namespaces,
-                            self._join_route(current_route, sub_match.route),
-                            tried,
-                            captured_kwargs=sub_match.captured_kwargs,
-                            extra_kwargs={
-                                **self.default_kwargs,
-                                **sub_match.extra_kwargs,
-                            },
-                        )
+                        return self._make_match(pattern, sub_match, args, kwargs, tried)
                     tried.append([pattern])
             raise Resolver404({"tried": tried, "path": new_path})
         raise Resolver404({"path": path})
+
+
+def get_resolver(urlconf=None):
+    if urlconf is None:
+        urlconf = settings.ROOT_URLCONF
+    return _get_cached_resolver(urlconf)
+
+
+@functools.lru_cache(maxsize=None)
+def _get_cached_resolver(urlconf=None):
+    return MyURLResolver(RegexPattern(r"^/"), urlconf)
+
+
+def clear_url_caches():
+    """
+    Drop the cached resolvers together with their compiled routes and
+    resolve caches. Call after reloading the urlconf.
+    """
+    _clear_url_caches()
+    _get_cached_resolver.cache_clear()
+
+
+@receiver(setting_changed)
+def root_urlconf_changed(*, setting, **kwargs):
+    if setting == "ROOT_URLCONF":
+        clear_url_caches()
@@ -0,0 +1,96 @@
+import django
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models.query import ModelIterable
+from django.db.models.sql.constants import GET_ITERATOR_CHUNK_SIZE
+from django.http import StreamingHttpResponse
+
+from vinyl.futures import is_async
+
+
+if django.VERSION >= (4, 2):
+    # StreamingHttpResponse takes async iterators since django 4.2.
+    AsyncStreamingHttpResponse = StreamingHttpResponse
+else:
+    class AsyncStreamingHttpResponse(StreamingHttpResponse):
+        """
+        A streaming response with an async iterable as content. Can only be
+        served by VinylASGIHandler.
+        """
+        is_async = True
+
+        @property
+        def streaming_content(self):
+            async def streaming_content(iterator=self._iterator):
+                async for part in iterator:
+                    yield self.make_bytes(part)
+
+            return streaming_content()
+
+        @streaming_content.setter
+        def streaming_content(self, value):
+            self._set_streaming_content(value)
+
+        def _set_streaming_content(self, value):
+            self._iterator = aiter(value)
+
+        def __iter__(self):
+            raise TypeError(
+                "%s can only be consumed asynchronously." % self.__class__.__name__
+            )
+
+        def __aiter__(self):
+            return self.streaming_content
+
+        def getvalue(self):
+            raise TypeError(
+                "%s can only be consumed asynchronously." % self.__class__.__name__
+            )
+
+
+class JsonStreamingResponse(AsyncStreamingHttpResponse):
+    """
+    Stream the results of a queryset as a JSON array, one fragment per
+    chunk of rows fetched.
+
+    Model querysets are turned into values(*fields) querysets, so that no
+    instances get built; pass a serializer (instance -> JSON-serializable
+    object) to encode the instances instead.
+
+    Async mode only.
+    """
+
+    def __init__(
+        self,
+        queryset,
+        fields=(),
+        serializer=None,
+        encoder=DjangoJSONEncoder,
+        chunk_size=GET_ITERATOR_CHUNK_SIZE,
+        json_dumps_params=None,
+        **kwargs,
+    ):
+        if not is_async():
+            raise TypeError("%s requires the async mode." % self.__class__.__name__)
+        if serializer is None and (fields or queryset._iterable_class is ModelIterable):
+            queryset = queryset.values(*fields)
+        kwargs.setdefault("content_type", "application/json")
+        encode = encoder(**(json_dumps_params or {})).encode
+        super().__init__(
+            self.encode_chunks(queryset, serializer, encode, chunk_size), **kwargs
+        )
+
+    @staticmethod
+    async def encode_chunks(queryset, serializer, encode, chunk_size):
+        separator = "["
+        chunks = queryset.chunks(chunk_size)
+        try:
+            async for objects in chunks:
+                if not objects:
+                    continue
+                if serializer is not None:
+                    objects = map(serializer, objects)
+                yield separator + ",".join(map(encode, objects))
+                separator = ","
+        finally:
+            await chunks.aclose()
+        yield "[]" if separator == "[" else "]"
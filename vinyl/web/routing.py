@@ -0,0 +1,205 @@
+import re
+
+from django.urls import URLResolver
+from django.urls.converters import PathConverter
+from django.urls.resolvers import RoutePattern
+
+
+_PARAMETER_RE = re.compile(r"<(?:(?P<converter>[^>:]+):)?(?P<parameter>[^>]+)>")
+
+
+class NotCompilable(Exception):
+    pass
+
+
+class Endpoint:
+    """
+    A url pattern reachable from the root of a RouteTable, with everything
+    ResolverMatch needs precomputed.
+    """
+
+    def __init__(self, order, pattern, func, resolvers, routes, levels):
+        self.order = order
+        self.pattern = pattern
+        self.func = func
+        self.url_name = pattern.name
+        self.route = "".join(routes)
+        self.app_names = [r.app_name for r in resolvers]
+        self.namespaces = [r.namespace for r in resolvers]
+        # parameter -> index of the pattern capturing it
+        self.levels = levels
+        # default kwargs from the outermost resolver to the pattern, the
+        # root resolver excluded
+        self.defaults = [r.default_kwargs for r in resolvers[1:]] + [pattern.default_args]
+        self.extra_kwargs = {}
+        for defaults in self.defaults:
+            self.extra_kwargs.update(defaults)
+
+    def get_kwargs(self, captured):
+        """
+        Merge the captured values and the default kwargs the way nested
+        URLResolver.resolve() calls do: the inner levels override the outer
+        ones. Return (kwargs, captured kwargs of the pattern).
+        """
+        by_level = [{} for _ in self.defaults]
+        for name, value in captured:
+            by_level[self.levels[name]][name] = value
+        kwargs = {}
+        for defaults, level_kwargs in zip(reversed(self.defaults), reversed(by_level)):
+            kwargs = {**level_kwargs, **defaults, **kwargs}
+        return kwargs, by_level[-1]
+
+
+class Param:
+    __slots__ = ("key", "regex", "converter", "name", "node")
+
+    def __init__(self, key, converter, name):
+        self.key = key
+        self.regex = re.compile(converter.regex)
+        self.converter = converter
+        self.name = name
+        self.node = Node()
+
+
+class Node:
+    __slots__ = ("static", "params", "views")
+
+    def __init__(self):
+        self.static = {}  # segment -> Node
+        self.params = []  # [Param]
+        self.views = {}  # method (None for any) -> Endpoint
+
+    def get_param_node(self, key, converter, name):
+        for param in self.params:
+            if param.key == key:
+                return param.node
+        param = Param(key, converter, name)
+        self.params.append(param)
+        return param.node
+
+    def get_view(self, method):
+        views = self.views
+        if method is None:
+            candidates = views.values()
+        else:
+            candidates = [views.get(method), views.get(None)]
+            if method == "head" and not candidates[0]:
+                candidates[0] = views.get("get")
+            candidates = [e for e in candidates if e]
+        return min(candidates, key=get_order, default=None)
+
+
+def get_order(endpoint):
+    return endpoint.order
+
+
+class RouteTable:
+    """
+    The patterns of a resolver compiled into a trie of path segments:
+    static segments are dict lookups, the segments made of a single
+    converter are tried with the converter regex. A method -> endpoint
+    table sits at the leaves.
+
+    The top-level patterns that can't be compiled (regex patterns, the
+    `path` converter, converters mixed with text in a segment, lazy routes)
+    are kept aside and resolved the usual way. Every pattern keeps its
+    position in the urlconf so that the first one matching wins, as with
+    the linear resolution.
+    """
+
+    def __init__(self, resolver):
+        self.root = Node()
+        self.fallback = []  # [(order, pattern)]
+        for i, pattern in enumerate(resolver.url_patterns):
+            try:
+                endpoints = list(self.compile(pattern, (i,), [resolver], [], {}))
+            except NotCompilable:
+                self.fallback.append(((i,), pattern))
+                continue
+            for method, endpoint, segments in endpoints:
+                self.insert(method, endpoint, segments)
+
+    def compile(self, pattern, order, resolvers, routes, levels):
+        route_pattern = pattern.pattern
+        if not isinstance(route_pattern, RoutePattern):
+            raise NotCompilable
+        route = route_pattern._route
+        if not isinstance(route, str):
+            raise NotCompilable
+        levels = dict(levels)
+        for match in _PARAMETER_RE.finditer(route):
+            levels[match["parameter"]] = len(routes)
+        routes = [*routes, route]
+        if isinstance(pattern, URLResolver):
+            for j, sub_pattern in enumerate(pattern.url_patterns):
+                yield from self.compile(
+                    sub_pattern, order + (j,), [*resolvers, pattern], routes, levels
+                )
+            return
+        segments = self.parse(resolvers, pattern, routes, levels)
+        views = getattr(pattern, "views", None) or {
+            getattr(pattern, "method", None): pattern.callback
+        }
+        for method, func in views.items():
+            yield method, Endpoint(order, pattern, func, resolvers, routes, levels), segments
+
+    def parse(self, resolvers, pattern, routes, levels):
+        patterns = [*(r.pattern for r in resolvers[1:]), pattern.pattern]
+        segments = []
+        for segment in "".join(routes).split("/"):
+            if "<" not in segment and ">" not in segment:
+                segments.append(segment)
+                continue
+            match = _PARAMETER_RE.fullmatch(segment)
+            if not match:
+                raise NotCompilable
+            name = match["parameter"]
+            converter = patterns[levels[name]].converters[name]
+            if isinstance(converter, PathConverter):
+                raise NotCompilable
+            segments.append((converter, name))
+        return segments
+
+    def insert(self, method, endpoint, segments):
+        node = self.root
+        for segment in segments:
+            if isinstance(segment, str):
+                node = node.static.setdefault(segment, Node())
+            else:
+                converter, name = segment
+                key = (type(converter), converter.regex, name)
+                node = node.get_param_node(key, converter, name)
+        node.views.setdefault(method, endpoint)
+
+    def lookup(self, path, method):
+        """
+        Return (endpoint, captured values) of the first compiled pattern
+        matching path and method, or None, along with the methods of the
+        patterns matching the path only.
+        """
+        segments = path.split("/")
+        count = len(segments)
+        found = None
+        allowed = set()
+        stack = [(self.root, 0, ())]
+        while stack:
+            node, i, captured = stack.pop()
+            if i == count:
+                endpoint = node.get_view(method)
+                if endpoint is None:
+                    allowed.update(node.views)
+                elif found is None or endpoint.order < found[0].order:
+                    found = endpoint, captured
+                continue
+            segment = segments[i]
+            if child := node.static.get(segment):
+                stack.append((child, i + 1, captured))
+            for param in node.params:
+                if not param.regex.fullmatch(segment):
+                    continue
+                try:
+                    value = param.converter.to_python(segment)
+                except ValueError:
+                    continue
+                stack.append((param.node, i + 1, (*captured, (param.name, value))))
+        return found, allowed